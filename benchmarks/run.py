@@ -0,0 +1,156 @@
+"""benchmark suite: rasterization of polygons, circles and paths, neighbour walks and predicates.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output new.json --compare results.json
+
+Each case is run once under tracemalloc for its peak memory, then timed without it (best of --repeat runs).
+Results are saved as JSON; --compare prints the ratio of each case to a previous run and exits with status 1 when
+one got slower than --threshold.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks import fixtures
+from geotools.utils import adjacent, intersects, BASE
+from geotools.utils.circle import Circle
+from geotools.utils.path import Path
+from geotools.utils.polygon import Polygon
+
+
+def measure(function, repeat):
+    """return (best time in seconds, peak memory in bytes, result of the call)."""
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best, peak, result
+
+
+def cases(quick):
+    """yield (group, name, params, function, count) where count tells how many cells (or operations) a call
+    produces from its result."""
+    scale = 10 if quick else 1
+    # quick modes only see the corners of the cells: start at a precision where some corners fall inside
+    precisions = {"paris": (5, 7), "medium": (4, 7), "country": (3, 5 if quick else 6)}
+    polygons = dict((name, Polygon(coordinates)) for name, coordinates in fixtures.POLYGONS.items()
+                    if not quick or name != "country")
+    for name, polygon in polygons.items():
+        for mode in ("fill", "cover", "qfill", "qcover", "sfill", "scover"):
+            method = getattr(polygon, mode)
+            yield "polygon", "{0}.{1}".format(name, mode), \
+                {"vertices": len(polygon._edges), "min_precision": precisions[name][0],
+                 "max_precision": precisions[name][1]}, \
+                (lambda method=method, precision=precisions[name]: method(*precision)), len
+
+    for radius, hashlength in ((100, 8), (1000, 8), (10000, 7)):
+        circle = Circle((2.35, 48.85), radius)
+        yield "circle", "circle.{0}m".format(radius), {"radius": radius, "hashlength": hashlength}, \
+            (lambda circle=circle, hashlength=hashlength: circle.hashcodes(hashlength)), len
+
+    for points, precision in ((1000, 9), (100000 // scale, 8)):
+        path = Path(fixtures.track(points))
+        yield "path", "path.{0}".format(points), {"points": points, "precision": precision}, \
+            (lambda path=path, precision=precision: path.hashes(precision)), len
+
+    rng = np.random.default_rng(fixtures.SEED)
+    hashcodes = ["".join(BASE[i] for i in row) for row in rng.integers(0, 32, (100000 // scale, 9)).tolist()]
+    yield "predicate", "adjacent", {"calls": 4 * len(hashcodes)}, \
+        (lambda: [adjacent(hashcode, direction) for hashcode in hashcodes for direction in "nsew"]), len
+
+    segments = rng.uniform(0, 1, (100000 // scale, 8)).tolist()
+    yield "predicate", "intersects", {"calls": len(segments)}, \
+        (lambda: [intersects(((a, b), (c, d)), ((e, f), (g, h))) for a, b, c, d, e, f, g, h in segments]), len
+
+    lons, lats = fixtures.points(10000 // scale)
+    for name, polygon in polygons.items():
+        yield "predicate", "{0}.contains".format(name), {"calls": len(lons), "vertices": len(polygon._edges)}, \
+            (lambda polygon=polygon: [polygon.contains(point) for point in zip(lons.tolist(), lats.tolist())]), len
+        yield "predicate", "{0}.contains_many".format(name), {"calls": len(lons), "vertices": len(polygon._edges)}, \
+            (lambda polygon=polygon: polygon.contains_many(lons, lats)), len
+
+    # scaling with the number of vertices, then with the precision
+    for vertices in ((1000, 4000) if quick else (1000, 4000, 16000, 64000)):
+        polygon = Polygon(fixtures.ring(vertices, radius=0.5))
+        yield "scaling", "vertices.{0}".format(vertices), {"vertices": vertices, "max_precision": 6}, \
+            (lambda polygon=polygon: polygon.fill(2, 6)), len
+    for precision in range(5, 8 if quick else 10):
+        yield "scaling", "precision.{0}".format(precision), {"vertices": len(polygons["paris"]._edges),
+                                                             "max_precision": precision}, \
+            (lambda precision=precision: polygons["paris"].fill(5, precision)), len
+
+
+def run(quick=False, repeat=3, only=None):
+    results = list()
+    for group, name, params, function, count in cases(quick):
+        if only and only not in name:
+            continue
+        seconds, peak, result = measure(function, repeat)
+        cells = count(result)
+        results.append({"group": group, "name": name, "params": params, "seconds": seconds, "cells": cells,
+                        "cells_per_second": cells / seconds if seconds else None, "peak_memory": peak})
+        print("{0:<28} {1:>10.4f}s {2:>10d} cells {3:>14.0f} cells/s {4:>10.1f} MiB".format(
+            name, seconds, cells, cells / seconds if seconds else 0, peak / 2 ** 20), file=sys.stderr)
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(results, previous, threshold):
+    """print the time ratio of each case to the previous run, return the names of the cases that regressed."""
+    before = dict((result["name"], result) for result in previous["results"])
+    regressions = list()
+    for result in results:
+        if result["name"] not in before:
+            continue
+        ratio = result["seconds"] / before[result["name"]]["seconds"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(result["name"])
+            flag = " <- slower"
+        print("{0:<28} {1:>10.4f}s {2:>10.4f}s {3:>6.2f}x{4}".format(
+            result["name"], before[result["name"]]["seconds"], result["seconds"], ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--output", help="file to save the results to, as JSON")
+    parser.add_argument("--compare", help="results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="time ratio above which a case counts as a regression (default: 1.25)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each case (default: 3)")
+    parser.add_argument("--quick", action="store_true", help="smaller fixtures, for a smoke run")
+    parser.add_argument("--only", help="only run the cases whose name contains this string")
+    args = parser.parse_args(argv)
+
+    report = {"meta": metadata(), "quick": args.quick, "results": run(args.quick, args.repeat, args.only)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(report["results"], json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
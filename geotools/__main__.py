@@ -1,90 +1,254 @@
+"""pygeotools: rasterize the shapes of a file into geo hashes.
+
+    pygeotools countries.geojson -o countries.csv --mode cover --max-precision 6 --workers 8 --checkpoint countries.ckpt
+
+Input is GeoJSON (a FeatureCollection, a Feature or geometry, or one of those per line) or, with --input-format
+coordinates, one polygon per line as a JSON array of [lon, lat] positions. Polygons are filled or covered, paths
+(LineStrings) and circles (Points with a radius property, in meters) are covered at --max-precision.
+
+Output is streamed feature by feature as a geohash,feature csv table, as NDJSON {"feature": ..., "hashcodes": [...]}
+records, or as binary records (see geotools.utils.features.read_sets). The feature is its GeoJSON id if any, else
+its position in the input.
+
+With --checkpoint, the position of every finished feature is recorded along with the size of the output at that
+point. Running the same command again after an interruption truncates the output to the last finished feature and
+resumes from there, skipping the features already done.
+
+Features that cannot be read or rasterized are reported on the standard error and skipped, and the exit status is
+then 1. As there is no telling where the next feature starts, invalid GeoJSON ends the input where it is found.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from geotools.utils import DEFAULT_PRECISION
+from geotools.utils.circle import Circle
+from geotools.utils.features import read_features, shapes, write_sets
+from geotools.utils.hashset import GeohashSet
+from geotools.utils.path import Path
 from geotools.utils.polygon import Polygon
-import time
-
-
-def main():
-    p = Polygon([
-            [2.3957061767578125, 48.89812957181126],
-            [2.399139404296875, 48.890906639609454],
-            [2.3996543884277344, 48.88413419286922],
-            [2.4090957641601562, 48.8801831753449],
-            [2.412700653076172, 48.876570543321755],
-            [2.414073944091797, 48.8712640169951],
-            [2.414073944091797, 48.86358549323598],
-            [2.4164772033691406, 48.849354525964365],
-            [2.4125289916992188, 48.83466754148594],
-            [2.4109840393066406, 48.833989576686],
-            [2.4151039123535156, 48.83342459901093],
-            [2.4224853515625, 48.83591045312373],
-            [2.4199104309082027, 48.8414466848806],
-            [2.4199104309082027, 48.84359322235957],
-            [2.422313690185547, 48.84460997116046],
-            [2.4247169494628906, 48.84189859515306],
-            [2.4372482299804688, 48.84099477053062],
-            [2.4381065368652344, 48.84483591253515],
-            [2.440166473388672, 48.844497000090826],
-            [2.4406814575195312, 48.845965604118284],
-            [2.4465179443359375, 48.84585263610676],
-            [2.4468612670898438, 48.844948882840264],
-            [2.4631690979003906, 48.842689428318415],
-            [2.466602325439453, 48.83997794833464],
-            [2.4702072143554688, 48.83647540276501],
-            [2.469348907470703, 48.833876581660704],
-            [2.4657440185546875, 48.83184262762493],
-            [2.4647140502929688, 48.827774471831894],
-            [2.466602325439453, 48.827322434132746],
-            [2.4631690979003906, 48.81884597223549],
-            [2.4587059020996094, 48.81681140805428],
-            [2.4494361877441406, 48.81805476264432],
-            [2.441883087158203, 48.81794173168324],
-            [2.4339866638183594, 48.81941111429733],
-            [2.4302101135253906, 48.823140892101684],
-            [2.4199104309082027, 48.82415805606007],
-            [2.4114990234375, 48.82483615389669],
-            [2.4025726318359375, 48.829695586560575],
-            [2.364120483398437, 48.81590713080018],
-            [2.3557090759277344, 48.81579409499648],
-            [2.351932525634765, 48.81828082380189],
-            [2.346954345703125, 48.81579409499648],
-            [2.33184814453125, 48.816924441564105],
-            [2.332019805908203, 48.818393853998344],
-            [2.291507720947265, 48.826983403182346],
-            [2.2789764404296875, 48.832407623139915],
-            [2.272796630859375, 48.82788748061953],
-            [2.267303466796875, 48.827774471831894],
-            [2.2667884826660156, 48.83161662763493],
-            [2.270050048828125, 48.832972612283456],
-            [2.267475128173828, 48.83466754148594],
-            [2.2630119323730464, 48.833876581660704],
-            [2.25494384765625, 48.83466754148594],
-            [2.2513389587402344, 48.838961105496054],
-            [2.2508239746093746, 48.84291537835776],
-            [2.252025604248047, 48.84517482268593],
-            [2.2420692443847656, 48.847773057644694],
-            [2.2394943237304688, 48.850145241393776],
-            [2.2235298156738277, 48.85342092943525],
-            [2.2279930114746094, 48.86584400488787],
-            [2.2322845458984375, 48.87024780944447],
-            [2.239837646484375, 48.87171565817035],
-            [2.245502471923828, 48.876570543321755],
-            [2.255115509033203, 48.87408670745326],
-            [2.2585487365722656, 48.88063473600221],
-            [2.2774314880371094, 48.87815110193676],
-            [2.279834747314453, 48.87894136251639],
-            [2.2806930541992188, 48.883005362568866],
-            [2.2848129272460938, 48.886617529842795],
-            [2.2930526733398438, 48.890455171696374],
-            [2.294769287109375, 48.889890831072385],
-            [2.310047149658203, 48.897113910028416],
-            [2.3186302185058594, 48.89982229558958],
-            [2.3201751708984375, 48.90106358992757],
-            [2.384033203125, 48.902417694046676],
-            [2.3919296264648438, 48.90106358992757],
-            [2.3957061767578125, 48.89812957181126]
-    ])
-    t = time.time()
-    print((p.hashcodes(min_precision=2, max_precision=7, cover=False)))
-    print("elapsed time: {0:.2f}s".format(time.time() - t))
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+
+MODES = ("fill", "cover", "qfill", "qcover", "sfill", "scover")
+FORMATS = ("csv", "ndjson", "binary")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="pygeotools", description=__doc__.split("\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.split("\n")[4:]))
+    parser.add_argument("input", help="file to read, - for the standard input")
+    parser.add_argument("-o", "--output", default="-", help="file to write, - for the standard output (default)")
+    parser.add_argument("--input-format", choices=("geojson", "coordinates"), default="geojson")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="output format (default: csv)")
+    parser.add_argument("--mode", choices=MODES, default="fill", help="polygon rasterization (default: fill)")
+    parser.add_argument("--min-precision", type=int, default=2)
+    parser.add_argument("--max-precision", type=int, default=7)
+    parser.add_argument("--simplify", action="store_true", help="simplify polygons first, see Polygon.hashcodes")
+    parser.add_argument("--compact", action="store_true", help="merge complete sets of sibling geo hashes")
+    parser.add_argument("--radius", default="radius", help="property holding the radius of Point features")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, 0 for one per cpu)")
+    parser.add_argument("--checkpoint", help="file recording finished features, to resume an interrupted run")
+    args = parser.parse_args(argv)
+    if not 1 <= args.min_precision <= args.max_precision <= DEFAULT_PRECISION:
+        parser.error("precisions must verify 1 <= min <= max <= {0:d}".format(DEFAULT_PRECISION))
+    if args.checkpoint and args.output == "-":
+        parser.error("--checkpoint needs an output file")
+    return args
+
+
+def rasterize(shape, mode="fill", min_precision=2, max_precision=7, simplify=False, compact=False):
+    """return the geo hashes of a shape, see the command line options."""
+    if isinstance(shape, Polygon):
+        hashcodes = shape.hashcodes(min_precision, max_precision, cover=mode.endswith("cover"),
+                                    quick=mode.startswith("q"), scanline=mode.startswith("s"), simplify=simplify)
+    elif isinstance(shape, Path):
+        hashcodes = shape.hashes(max_precision)
+    elif isinstance(shape, Circle):
+        hashcodes = shape.hashcodes(max_precision)
+    else:
+        raise ValueError("cannot rasterize {0!r}".format(shape))
+    return list(GeohashSet(hashcodes).compact()) if compact else list(hashcodes)
+
+
+def _rasterize_feature(index, feature_shapes, options):
+    """return (index, geo hashes of the shapes, None) or (index, None, the error that stopped rasterizing them)."""
+    hashcodes = dict()
+    try:
+        for shape in feature_shapes:
+            hashcodes.update((hashcode, None) for hashcode in rasterize(shape, **options))
+    except Exception as error:  # report it with the feature rather than end the whole run
+        return index, None, error
+    return index, list(hashcodes), None
+
+
+def _features(fp, input_format):
+    """yield the features of the input, or the error that prevented reading one in their place."""
+    if input_format == "coordinates":
+        for line in fp:
+            if not line.strip():
+                continue
+            try:
+                coordinates = json.loads(line)
+            except ValueError as error:
+                yield error
+                continue
+            yield {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [coordinates]}}
+        return
+    features = read_features(fp)
+    while True:
+        try:
+            feature = next(features)
+        except StopIteration:
+            return
+        except ValueError as error:  # there is no telling where the next feature starts, the rest is lost
+            yield error
+            return
+        yield feature
+
+
+def read_input(fp, input_format="geojson", radius="radius"):
+    """yield (index, feature id, shapes or the error that prevented building them) for each feature. A line of
+    coordinates that cannot be parsed is reported on its own, invalid GeoJSON is reported and ends the input.
+    """
+    for index, feature in enumerate(_features(fp, input_format)):
+        if isinstance(feature, Exception):
+            yield index, index, feature
+            continue
+        feature_id = feature.get("id", index)
+        try:
+            yield index, feature_id, shapes(feature, radius)
+        except (ValueError, TypeError, KeyError, IndexError) as error:
+            yield index, feature_id, error
+
+
+class Writer:
+    """streams results to the output in one of FORMATS."""
+
+    def __init__(self, fp, output_format):
+        self._fp = fp
+        self._format = output_format
+
+    def header(self):
+        if self._format == "csv":
+            self._fp.write(b"geohash,feature\n")
+
+    def write(self, feature_id, hashcodes):
+        if self._format == "binary":
+            write_sets(self._fp, [(feature_id, hashcodes)])
+            return
+        text = io.StringIO()
+        if self._format == "csv":
+            csv.writer(text, lineterminator="\n").writerows((hashcode, feature_id) for hashcode in hashcodes)
+        else:
+            text.write(json.dumps({"feature": feature_id, "hashcodes": hashcodes}) + "\n")
+        self._fp.write(text.getvalue().encode("utf-8"))
+
+
+class Checkpoint:
+    """records finished features as "index offset" lines, offset being the size of the output once the feature was
+    written. Lines are only appended once the output is flushed, so the last one always describes a sound output.
+    """
+
+    def __init__(self, path):
+        self.done = set()
+        self.offset = 0
+        size = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if not line.endswith("\n"):  # an interrupted write leaves a partial line
+                        break
+                    index, offset = line.split()
+                    self.done.add(int(index))
+                    self.offset = int(offset)
+                    size += len(line)
+        self._fp = open(path, "a")
+        self._fp.truncate(size)
+
+    def record(self, index, offset):
+        self.done.add(index)
+        self._fp.write("{0:d} {1:d}\n".format(index, offset))
+        self._fp.flush()
+
+    def close(self):
+        self._fp.close()
+
+
+def run(args, stdin=None, stdout=None):
+    """rasterize args.input into args.output, return the number of features that failed."""
+    options = dict(mode=args.mode, min_precision=args.min_precision, max_precision=args.max_precision,
+                   simplify=args.simplify, compact=args.compact)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    if args.output == "-":
+        output = stdout or sys.stdout.buffer
+    else:
+        output = open(args.output, "r+b" if checkpoint and os.path.exists(args.output) else "wb")
+        if checkpoint:
+            output.truncate(checkpoint.offset)
+            output.seek(checkpoint.offset)
+    source = (stdin or sys.stdin) if args.input == "-" else open(args.input, encoding="utf-8")
+    writer = Writer(output, args.format)
+    if not checkpoint or not checkpoint.offset:
+        writer.header()
+    ids, failures = dict(), list()
+
+    def fail(feature_id, error):
+        print("feature {0}: {1}".format(feature_id, error), file=sys.stderr)
+        failures.append(feature_id)
+
+    def finish(index, hashcodes, error):
+        if error is not None:
+            return fail(ids.pop(index), error)
+        writer.write(ids.pop(index), hashcodes)
+        output.flush()
+        if checkpoint:
+            checkpoint.record(index, output.tell())
+
+    workers = args.workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = set()
+    try:
+        for index, feature_id, feature_shapes in read_input(source, args.input_format, args.radius):
+            if checkpoint and index in checkpoint.done:
+                continue
+            if isinstance(feature_shapes, Exception):
+                fail(feature_id, feature_shapes)
+                continue
+            ids[index] = feature_id
+            if executor is None:
+                finish(*_rasterize_feature(index, feature_shapes, options))
+                continue
+            pending.add(executor.submit(_rasterize_feature, index, feature_shapes, options))
+            # bound the features in flight, so that the input is streamed too
+            if len(pending) >= 4 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(*future.result())
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(*future.result())
+    finally:
+        if executor is not None:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+        if checkpoint:
+            checkpoint.close()
+        if source is not (stdin or sys.stdin):
+            source.close()
+        if args.output != "-":
+            output.close()
+    return len(failures)
+
+
+def main(argv=None):
+    return 1 if run(parse_args(argv)) else 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
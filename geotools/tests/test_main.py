@@ -0,0 +1,161 @@
+import contextlib
+import geotools.__main__
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+from unittest import main
+from unittest import mock
+
+from geotools.__main__ import main as pygeotools
+from geotools.utils.circle import Circle
+from geotools.utils.features import read_sets
+from geotools.utils.hashset import GeohashSet
+from geotools.utils.polygon import Polygon
+
+
+class MainTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.squares = [[[2.0 + i, 48.0], [2.5 + i, 48.0], [2.5 + i, 48.5], [2.0 + i, 48.5], [2.0 + i, 48.0]]
+                        for i in range(4)]
+        features = [{"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [square]}, "properties": {}}
+                    for square in self.squares]
+        features[1]["id"] = "b"
+        features.append({"type": "Feature", "id": "circle", "geometry": {"type": "Point", "coordinates": [2.35, 48.85]},
+                         "properties": {"r": 1000}})
+        self.input = self.path("input.geojson")
+        with open(self.input, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f)
+        self.expected = [set(Polygon(square).fill(2, 5)) for square in self.squares]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def table(self, name):
+        with open(self.path(name)) as f:
+            self.assertEqual("geohash,feature\n", f.readline())
+            rows = dict()
+            for line in f:
+                hashcode, feature_id = line.strip().split(",")
+                rows.setdefault(feature_id, set()).add(hashcode)
+            return rows
+
+    def test_csv(self):
+        self.assertEqual(0, pygeotools([self.input, "-o", self.path("out.csv"), "--max-precision", "5",
+                                        "--radius", "r"]))
+        rows = self.table("out.csv")
+        self.assertListEqual(["0", "b", "2", "3", "circle"], list(rows))
+        self.assertListEqual(self.expected, [rows[feature_id] for feature_id in ("0", "b", "2", "3")])
+        self.assertIn("u09tv", rows["circle"])
+
+    def test_formats(self):
+        for workers in ("1", "2"):
+            self.assertEqual(0, pygeotools([self.input, "-o", self.path("out.ndjson"), "--format", "ndjson",
+                                            "--max-precision", "5", "--workers", workers]))
+            with open(self.path("out.ndjson")) as f:
+                records = dict((record["feature"], set(record["hashcodes"])) for record in map(json.loads, f))
+            self.assertDictEqual({0: self.expected[0], "b": self.expected[1], 2: self.expected[2],
+                                  3: self.expected[3], "circle": set()}, records)
+        self.assertEqual(0, pygeotools([self.input, "-o", self.path("out.bin"), "--format", "binary",
+                                        "--max-precision", "5", "--compact", "--mode", "cover"]))
+        with open(self.path("out.bin"), "rb") as f:
+            sets = list(read_sets(f))
+        self.assertListEqual([0, "b", 2, 3, "circle"], [feature_id for feature_id, _ in sets])
+        for (_, hashcodes), square in zip(sets, self.squares):
+            self.assertSetEqual(set(GeohashSet(Polygon(square).cover(2, 5)).expand(5)), set(hashcodes.expand(5)))
+
+    def test_coordinates(self):
+        with open(self.path("input.txt"), "w") as f:
+            f.write("\n".join(json.dumps(square) for square in self.squares) + "\n")
+        self.assertEqual(0, pygeotools([self.path("input.txt"), "--input-format", "coordinates",
+                                        "-o", self.path("out.csv"), "--max-precision", "5"]))
+        self.assertListEqual(self.expected, list(self.table("out.csv").values()))
+
+    def test_errors(self):
+        with open(self.path("input.txt"), "w") as f:
+            f.write(json.dumps(self.squares[0]) + "\n[[0, 0], [1, 1]]\n" + json.dumps(self.squares[2]) + "\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(1, pygeotools([self.path("input.txt"), "--input-format", "coordinates",
+                                            "-o", self.path("out.csv"), "--max-precision", "5"]))
+        self.assertIn("feature 1: a polygon must have at least three points", stderr.getvalue())
+        self.assertListEqual(["0", "2"], list(self.table("out.csv")))
+        # a line that is not JSON is skipped as well
+        with open(self.path("input.txt"), "w") as f:
+            f.write(json.dumps(self.squares[0]) + "\n[[0, 0], [1, \n" + json.dumps(self.squares[2]) + "\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(1, pygeotools([self.path("input.txt"), "--input-format", "coordinates",
+                                            "-o", self.path("out.csv"), "--max-precision", "5"]))
+        self.assertIn("feature 1: ", stderr.getvalue())
+        self.assertListEqual(["0", "2"], list(self.table("out.csv")))
+        # invalid GeoJSON ends the input, the features read so far are kept
+        with open(self.path("input.ndjson"), "w") as f:
+            for square in self.squares[:2]:
+                f.write(json.dumps({"type": "Polygon", "coordinates": [square]}) + "\n")
+            f.write('{"type": "Polygon", "coordinates": [[[2.0, 48.0], [2.5\n')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(1, pygeotools([self.path("input.ndjson"), "-o", self.path("out.csv"),
+                                            "--max-precision", "5"]))
+        self.assertIn("feature 2: ", stderr.getvalue())
+        self.assertListEqual(["0", "1"], list(self.table("out.csv")))
+
+    def test_rasterization_errors(self):
+        north = [[2.3, 48.8], [2.4, 48.8], [2.35, 48.9]]
+        with open(self.path("input.txt"), "w") as f:
+            f.write(json.dumps(north) + "\n")
+        self.assertEqual(0, pygeotools([self.path("input.txt"), "--input-format", "coordinates",
+                                        "-o", self.path("out.csv"), "--min-precision", "1", "--max-precision", "4",
+                                        "--mode", "cover"]))
+        self.assertSetEqual(set(Polygon(north).cover(1, 4)), self.table("out.csv")["0"])
+        # a feature that fails while rasterized is reported and skipped like one that cannot be read
+        rasterize = geotools.__main__.rasterize
+
+        def failing(shape, **options):
+            if isinstance(shape, Circle):
+                raise MemoryError("too large")
+            return rasterize(shape, **options)
+
+        stderr = io.StringIO()
+        with mock.patch("geotools.__main__.rasterize", failing), contextlib.redirect_stderr(stderr):
+            self.assertEqual(1, pygeotools([self.input, "-o", self.path("out.csv"), "--max-precision", "5",
+                                            "--radius", "r"]))
+        self.assertIn("feature circle: too large", stderr.getvalue())
+        self.assertListEqual(["0", "b", "2", "3"], list(self.table("out.csv")))
+
+    def test_checkpoint(self):
+        args = [self.input, "-o", self.path("out.csv"), "--max-precision", "5", "--checkpoint", self.path("ckpt")]
+        self.assertEqual(0, pygeotools(args))
+        with open(self.path("out.csv")) as f:
+            complete = f.read()
+        with open(self.path("ckpt")) as f:
+            lines = f.readlines()
+        self.assertEqual(5, len(lines))
+        # interrupted after the second feature, while writing the third one
+        with open(self.path("ckpt"), "w") as f:
+            f.writelines(lines[:2])
+            f.write(lines[2][:1])
+        with open(self.path("out.csv"), "a") as f:
+            f.write("garbage\n")
+        with open(self.path("out.csv"), "r+") as f:
+            f.truncate(int(lines[1].split()[1]) + 3)
+        self.assertEqual(0, pygeotools(args))
+        with open(self.path("out.csv")) as f:
+            self.assertEqual(complete, f.read())
+        # nothing left to do
+        self.assertEqual(0, pygeotools(args))
+        with open(self.path("out.csv")) as f:
+            self.assertEqual(complete, f.read())
+
+
+if __name__ == '__main__':
+    main()
@@ -22,8 +22,10 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import functools
 import geohash
-from geopy.distance import GreatCircleDistance
+import numpy as np
+from geotools.utils import geodesic
 
 
 DEFAULT_PRECISION = 9
@@ -42,6 +44,11 @@ EDGE_CASES = {
     'w': ['0145hjnp', '028b']
 }
 
+# lookup tables derived from the ones above: the neighbour of each character and the characters on each border
+ADJACENT = dict((direction, [dict(zip(NEIGHBOURS[direction][odd], BASE)) for odd in (0, 1)])
+                for direction in NEIGHBOURS)
+BORDERS = dict((direction, [frozenset(EDGE_CASES[direction][odd]) for odd in (0, 1)]) for direction in EDGE_CASES)
+
 
 def is_west(lon0, lon1):
     clon0, clon1 = lon0 + 180, lon1 + 180
@@ -69,17 +76,46 @@ def adjacent(hashcode, direction):
     # https://github.com/chrisveness/latlon-geohash/blob/master/latlon-geohash.js
     if not hashcode:
         raise ValueError('Invalid geohash')
-    if direction not in 'nsew':
+    if direction not in ADJACENT:
         raise ValueError('Invalid direction')
+    try:
+        return _adjacent(hashcode, direction)
+    except KeyError:
+        raise ValueError('Invalid geohash')
+
+
+def neighbours(hashcode):
+    """return the 8 neighbours of the geo hash, keyed by direction. Neighbours beyond the poles are None."""
+    n, s = adjacent(hashcode, 'n'), adjacent(hashcode, 's')
+    return {
+        'n': n, 'ne': adjacent(n, 'e') if n else None, 'e': adjacent(hashcode, 'e'),
+        'se': adjacent(s, 'e') if s else None, 's': s, 'sw': adjacent(s, 'w') if s else None,
+        'w': adjacent(hashcode, 'w'), 'nw': adjacent(n, 'w') if n else None
+    }
+
+
+def cache_adjacent(maxsize=4096):
+    """keep the last maxsize results of adjacent in a LRU cache. A maxsize of 0 turns the cache off."""
+    global _adjacent
+    _adjacent = functools.lru_cache(maxsize=maxsize)(_walk) if maxsize else _walk
+
+
+def _walk(hashcode, direction):
+    """replace the trailing characters of the geo hash from the last one up, as long as they sit on the border of
+    their parent in that direction. The common prefix is kept as is.
+    """
+    tables, borders = ADJACENT[direction], BORDERS[direction]
+    suffix = list()
+    for i in range(len(hashcode) - 1, -1, -1):
+        c, odd = hashcode[i], (i + 1) % 2
+        suffix.append(tables[odd][c])
+        if c not in borders[odd]:
+            return hashcode[:i] + ''.join(reversed(suffix))
+    # the whole geo hash is on the border: there is nothing beyond the poles, longitudes wrap around
+    return None if direction in 'ns' else ''.join(reversed(suffix))
 
-    r, c = hashcode[:-1], hashcode[-1]
-    odd = len(hashcode) % 2
-    # check for edge-cases which don't share common prefix
-    if c in EDGE_CASES[direction][odd]:
-        r = adjacent(r, direction) if r else None if direction in 'ns' else ''
 
-    # append letter for direction to parent
-    return r + BASE[NEIGHBOURS[direction][odd].index(c)] if r is not None else None
+_adjacent = _walk
 
 
 def validate(longitude, latitude, strict=False):
@@ -97,6 +133,14 @@ def validate(longitude, latitude, strict=False):
 
     return True
 
+
+def avoid_poles(latitude):
+    # basically the algorithm can go into an endless loop. Best to avoid the poles.
+    if latitude < -89.75 or latitude > 89.75:
+        raise ValueError("please stay away from the north pole or the south pole; there are some known issues there. "
+                         "Besides, nothing there but snow and ice.")
+
+
 def _ccw(a, b, c):
     return (c[1] - a[1]) * (b[0] - a[0]) - (b[1] - a[1]) * (c[0] - a[0])
 
@@ -121,6 +165,28 @@ def intersects(line1, line2):
     return (sl1 > 0) != (sl2 > 0) and (sl3 > 0) != (sl4 > 0)
 
 
+def crosses_boxes(segments, boxes):
+    """vectorized segment / bbox test: for each row, tell whether segment [lon0, lat0, lon1, lat1] crosses the
+    inside of the box [w, s, e, n]. Segments lying inside a box cross it as well, segments that only meet its border
+    do not: a cell a ring merely touches lies on one side of it.
+    """
+    x0, y0, x1, y1 = (segments[:, i] for i in range(4))
+    w, s, e, n = (boxes[:, i] for i in range(4))
+    overlap = (np.maximum(x0, x1) > w) & (np.minimum(x0, x1) < e) & \
+              (np.maximum(y0, y1) > s) & (np.minimum(y0, y1) < n)
+    # the supporting line of the segment goes through the box if corners lie strictly on both of its sides
+    dx, dy = x1 - x0, y1 - y0
+    corners = [dx * (lat - y0) - dy * (lon - x0) for lon, lat in ((w, s), (e, s), (e, n), (w, n))]
+    lowest = np.minimum(np.minimum(corners[0], corners[1]), np.minimum(corners[2], corners[3]))
+    highest = np.maximum(np.maximum(corners[0], corners[1]), np.maximum(corners[2], corners[3]))
+    return overlap & (lowest < 0) & (highest > 0)
+
+
+def concat_ranges(counts):
+    """vectorized concatenation of range(count) for each count of an array."""
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
 def subhashcodes(hashcode):
     """return the 32 geo hashes this geohash can be divided into."""
     return [hashcode + c for c in BASE]
@@ -130,11 +196,10 @@ def matches(lon, lat, hashcode):
     return hashcode == geohash.encode(longitude=lon, latitude=lat, precision=len(hashcode))
 
 
-# TODO passer tous les parametres en lat, lon
-def distance(point0, point1):
-    return GreatCircleDistance((point0[1], point0[0]), (point1[1], point1[0])).meters
+def distance(point0, point1, method="haversine"):
+    """distance in meters between two (lon, lat) points, see geodesic.distances for the methods."""
+    return geodesic.distance(point0, point1, method)
 
 
-def destination_point(point, distance, bearing):
-    p = GreatCircleDistance(meters=distance).destination((point[1], point[0]), bearing=bearing)
-    return p.longitude, p.latitude
+def destination_point(point, distance, bearing, method="haversine"):
+    return geodesic.destination(point, distance, bearing, method)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from geotools.utils import *
+from geotools.utils import inthash
+from geotools.utils.circle import Circle
+from geotools.utils.polygon import Polygon
+import numpy as np
+import os
+
+
+def rasterize_many(polygons, min_precision=2, max_precision=DEFAULT_PRECISION, cover=False, quick=False,
+                   workers=None, scanline=False):
+    """rasterize several polygons over a pool of worker processes, see Polygon.hashcodes for the parameters.
+
+    Work is split per polygon, and large polygons are split further into tiles: their coarse levels are rasterized
+    here until there are enough boundary cells to keep every worker busy, then each tile of boundary cells is refined
+    in its own task.
+
+    Yields (index, hashcodes) pairs as tasks complete, index being the position of the polygon in polygons. A polygon
+    may come back in several pieces; the union of its pieces is the result of polygon.hashcodes(...). At most
+    4 * workers tasks are in flight, so polygons are read and results come back as the work goes.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_precision = min(max_precision, DEFAULT_PRECISION)
+    if workers == 1:
+        for index, polygon in enumerate(polygons):
+            yield index, polygon.hashcodes(min_precision, max_precision, cover=cover, quick=quick, scanline=scanline)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict()
+        for index, polygon in enumerate(polygons):
+            hashcodes, tiles = _split(polygon, min_precision, max_precision, cover, quick, workers, scanline)
+            if hashcodes:
+                yield index, hashcodes
+            for precision, cells, pairs in tiles:
+                future = executor.submit(_rasterize, polygon, precision, max_precision, cover, quick, cells, pairs,
+                                         scanline)
+                futures[future] = index
+                if len(futures) >= 4 * workers:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield futures.pop(future), future.result()
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def cover_circles(centers, radius, hashlength=10, workers=None, chunk=1024):
+    """cover many circles at once, see Circle.hashcodes. radius is either shared by all circles or given per center.
+
+    Circles are covered by chunks: the rows of all circles of a chunk are spanned in one vectorized pass, and chunks
+    are spread over a pool of worker processes.
+
+    Yields (index, hashcodes) pairs as chunks complete, index being the position of the center in centers.
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radius, dtype=float), (len(centers),))
+    for lon, lat in centers:
+        validate(lon, lat)
+        avoid_poles(lat)
+    workers = workers or os.cpu_count() or 1
+    chunks = [(start, centers[start:start + chunk], radii[start:start + chunk], hashlength)
+              for start in range(0, len(centers), chunk)]
+    if workers == 1:
+        for arguments in chunks:
+            for pair in _cover_circles(*arguments):
+                yield pair
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(_cover_circles, *arguments) for arguments in chunks]):
+            for pair in future.result():
+                yield pair
+
+
+def _cover_circles(start, centers, radii, hashlength):
+    owners, cells = Circle._cells(centers[:, 0], centers[:, 1], radii, hashlength)
+    hashcodes = inthash.to_hashcodes(cells, hashlength)
+    bounds = np.searchsorted(owners, np.arange(len(centers) + 1)).tolist()
+    return [(start + index, set(hashcodes[bounds[index]:bounds[index + 1]])) for index in range(len(centers))]
+
+
+def _split(polygon, min_precision, max_precision, cover, quick, tiles, scanline=False):
+    """rasterize the coarse levels of the polygon until at least `tiles` boundary cells are found. Returns the geo
+    hashes found so far and the (precision, cells, pairs) arguments of the tasks refining the boundary cells.
+    """
+    hashcodes = list()
+    for precision, cells, inside, boundary, pairs in polygon._levels(min_precision, max_precision, quick=quick,
+                                                                     scanline=scanline):
+        last = precision == max_precision
+        hashcodes.extend(inthash.to_hashcodes(cells[inside | boundary if cover and last else inside], precision))
+        count = np.count_nonzero(boundary)
+        if last or not count:
+            return hashcodes, []
+        if count >= tiles:
+            break
+    else:
+        return hashcodes, []
+
+    children = inthash.children(cells[boundary])
+    pairs = None if quick or scanline else Polygon._split_pairs(boundary, pairs)
+    split = list()
+    for chunk in np.array_split(np.arange(count), tiles):
+        first, last = chunk[0] * 32, (chunk[-1] + 1) * 32
+        if pairs is None:
+            split.append((precision + 1, children[first:last], None))
+        else:
+            mask = (pairs[0] >= first) & (pairs[0] < last)
+            split.append((precision + 1, children[first:last], (pairs[0][mask] - first, pairs[1][mask])))
+    return hashcodes, split
+
+
+def _rasterize(polygon, precision, max_precision, cover, quick, cells, pairs, scanline=False):
+    return Polygon._collect(polygon._levels(precision, max_precision, quick, cells, pairs, scanline=scanline),
+                            max_precision, cover)
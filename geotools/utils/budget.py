@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""budgeted rasterization: refine a shape breadth first until a cell count or a deadline is reached.
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from geotools.utils import inthash
+import numpy as np
+import time
+
+
+def refine(levels, cover=True, max_cells=None, timeout=None):
+    """consume the (precision, cells, inside, boundary, pairs) levels of a rasterization, see Polygon._levels, and
+    stop refining once max_cells geo hashes or timeout seconds are reached. Returns the kept geo hashes as a list of
+    (precision, array of integer geo hashes) pairs.
+
+    Levels are refined breadth first. When a level does not fit in max_cells as a whole, the boundary cells whose
+    refinement costs the fewest extra cells are refined first, the others are kept as they are. In cover mode
+    boundary cells left unrefined are kept, so the result is always a valid cover at mixed precision; in fill mode
+    only inside cells are. The first level is always kept whole, even beyond max_cells.
+
+    The deadline is checked before each level, against the time the level should take at the pace of the previous
+    one, so the result comes back about when it is due rather than well after.
+    """
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    kept = list()
+    frontier = None  # the (precision, cells) on the boundary of the last level kept
+    count = 0
+    start = time.perf_counter()
+    for precision, cells, inside, boundary, _ in levels:
+        elapsed = time.perf_counter() - start
+        if frontier is None:
+            kept.append((precision, cells[inside]))
+            frontier = precision, cells[boundary]
+            count = np.count_nonzero(inside) + (np.count_nonzero(boundary) if cover else 0)
+        else:
+            # cells come by groups of 32 siblings, in the order of the parents on the frontier
+            parents = len(frontier[1])
+            children = (inside | boundary if cover else inside).reshape(parents, 32).sum(axis=1)
+            costs = children - 1 if cover else children
+            order = np.argsort(costs, kind="stable")
+            fits = count + np.cumsum(costs[order]) <= (np.inf if max_cells is None else max_cells)
+            accepted = np.zeros(parents, dtype=bool)
+            accepted[order[:int(np.argmin(fits)) if not fits.all() else parents]] = True
+            mask = np.repeat(accepted, 32)
+            kept.append((precision, cells[inside & mask]))
+            count += int(costs[accepted].sum())
+            if not accepted.all():
+                if cover:
+                    kept.append((precision, cells[boundary & mask]))
+                    kept.append((frontier[0], frontier[1][~accepted]))
+                frontier = None
+                break
+            frontier = precision, cells[boundary]
+        if not len(frontier[1]):
+            break
+        if max_cells is not None and count >= max_cells:
+            break
+        # the next level has about 32 cells per frontier cell: stop if it would not be done in time
+        if deadline is not None:
+            pace = elapsed / max(len(cells), 1)
+            if time.perf_counter() + pace * 32 * len(frontier[1]) > deadline:
+                break
+        start = time.perf_counter()
+    if cover and frontier is not None:
+        kept.append(frontier)
+    return [(precision, bits) for precision, bits in kept if len(bits)]
+
+
+def to_hashcodes(cells):
+    """return the geo hashes of a list of (precision, array of integer geo hashes) pairs."""
+    return [hashcode for precision, bits in cells for hashcode in inthash.to_hashcodes(bits, precision)]
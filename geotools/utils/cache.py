@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+
+class HashcodeCache:
+    """persistent cache of rasterization results, stored in a local sqlite file.
+
+    Entries are keyed by a hash of the shape coordinates and of the rasterization parameters, and hold the geo hashes
+    as a zlib compressed blob. When the blobs exceed max_size bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_size=256 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+
+    @staticmethod
+    def key(shape, coordinates, *params):
+        """return the cache key of a rasterization: shape is the kind of shape, params the rasterization options."""
+        payload = json.dumps([shape, coordinates, params], separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """return the cached geo hashes, or None if the entry is missing."""
+        row = self._connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._connection:
+            self._connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        value = zlib.decompress(row[0]).decode("ascii")
+        return value.split("\n") if value else []
+
+    def fetch(self, key, compute):
+        """return the cached geo hashes, computing them with compute() and storing them on a miss."""
+        hashcodes = self.get(key)
+        if hashcodes is None:
+            hashcodes = list(compute())
+            self.put(key, hashcodes)
+        return hashcodes
+
+    def put(self, key, hashcodes):
+        value = zlib.compress("\n".join(hashcodes).encode("ascii"))
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                                     (key, value, len(value), time.time()))
+        self._evict()
+
+    def invalidate(self, key):
+        with self._connection:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM entries")
+
+    def size(self):
+        """return the number of bytes held by the cached entries."""
+        return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def _evict(self):
+        total = self.size()
+        if total <= self.max_size:
+            return
+        with self._connection:
+            for key, size in self._connection.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                if total <= self.max_size:
+                    break
+                self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+
+    def __contains__(self, key):
+        return self._connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -23,7 +23,12 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 from geotools.utils import *
-import geohash
+from geotools.utils import budget
+from geotools.utils import geodesic
+from geotools.utils import inthash
+from geotools.utils.cache import HashcodeCache
+import math
+import numpy as np
 
 
 class Circle:
@@ -32,75 +37,91 @@ class Circle:
         self.center = point
         self.radius = radius
         validate(point[0], point[1])
-        # basically the algorithm can go into an endless loop. Best to avoid the poles.
-        if point[1] < -89.75 or point[1] > 89.75:
-            raise ValueError("please stay away from the north pole or the south pole; there are some known issues there. Besides, nothing there but snow and ice.")
+        avoid_poles(point[1])
+        width = geodesic.half_width(self.center, self.radius, -90, 90)
         self.__bbox = {
             "n": destination_point(self.center, self.radius, 0)[1],
             "s": destination_point(self.center, self.radius, 180)[1],
-            "e": destination_point(self.center, self.radius, 270)[0],
-            "w": destination_point(self.center, self.radius, 90)[0]
+            "e": Circle.__recenter(self.center[0] + width),
+            "w": Circle.__recenter(self.center[0] - width)
         }
 
     def bbox(self):
         return self.__bbox
 
-    def __is_included(self, bbox):
-        sw = (bbox["w"], bbox["s"])
-        se = (bbox["e"], bbox["s"])
-        nw = (bbox["w"], bbox["n"])
-        ne = (bbox["e"], bbox["n"])
-
-        if bbox["w"] < self.center[0] < bbox["e"]:
-            return distance(self.center, (self.center[0], bbox['n'])) <= self.radius or distance(self.center, (self.center[0], bbox['s'])) <= self.radius
-        if bbox["s"] < self.center[1] < bbox["n"]:
-            return distance(self.center, (bbox['w'], self.center[1])) <= self.radius or distance(self.center, (bbox['e'], self.center[1])) <= self.radius
-
-        return distance(self.center, sw) <= self.radius \
-               or distance(self.center, se) <= self.radius \
-               or distance(self.center, nw) <= self.radius \
-               or distance(self.center, ne) <= self.radius
-
     @staticmethod
     def __recenter(lon):
         return lon if -180 < lon < 180 else lon + 360 if -180 > lon else lon - 360
 
-    def hashcodes(self, hashlength=10):
-        west_set, east_set, hashcodes = set(), set(), set()
-
-        row_hashcode = geohash.encode(latitude=self.__bbox["s"], longitude=self.__bbox["w"], precision=hashlength)
-        row_bbox = geohash.bbox(row_hashcode)
-        while row_bbox["s"] < self.__bbox["n"]:
-            cell_hashcode = row_hashcode
-            cell_bbox = row_bbox
-            while is_west(cell_bbox["w"], self.__bbox["e"]):
-                if self.__is_included(cell_bbox):
-                    west_set.add(cell_hashcode)
-                    break
-                cell_hashcode = east(cell_hashcode)
-                cell_bbox = geohash.bbox(cell_hashcode)
-            row_hashcode = north(row_hashcode)
-            row_bbox = geohash.bbox(row_hashcode)
-
-        row_hashcode = geohash.encode(latitude=self.__bbox["s"], longitude=self.__bbox["e"], precision=hashlength)
-        row_bbox = geohash.bbox(row_hashcode)
-        while row_bbox["s"] < self.__bbox["n"]:
-            cell_hashcode = row_hashcode
-            cell_bbox = row_bbox
-            while not is_west(cell_bbox["e"], self.__bbox["w"]):
-                if self.__is_included(cell_bbox):
-                    east_set.add(cell_hashcode)
-                    break
-                cell_hashcode = west(cell_hashcode)
-                cell_bbox = geohash.bbox(cell_hashcode)
-            row_hashcode = north(row_hashcode)
-            row_bbox = geohash.bbox(row_hashcode)
-
-        for hashcode in west_set:
-            current = hashcode
-            while current not in east_set:
-                hashcodes.add(current)
-                current = east(current)
-        hashcodes.update(west_set)
-        hashcodes.update(east_set)
-        return hashcodes
+    def hashcodes(self, hashlength=10, cache=None, max_cells=None, timeout=None):
+        """return the geo hashes of the given length that intersect the circle.
+
+        Rows of geo hashes are filled in one go: the widest longitude span of the circle over the latitudes of a row
+        is computed analytically, and every cell of the row overlapping that span is part of the cover.
+
+        max_cells and timeout (in seconds) ask for a cover at mixed precision instead: cells wholly inside the
+        circle are kept as coarse as possible, and the ones on its edge are refined breadth first towards hashlength
+        until either budget is reached (see budget.refine). Budgeted results are not cached.
+        """
+        if max_cells is not None or timeout is not None:
+            return set(budget.to_hashcodes(budget.refine(self._levels(hashlength), True, max_cells, timeout)))
+        if cache is not None:
+            return set(cache.fetch(HashcodeCache.key("circle", self.center, self.radius, hashlength),
+                                   lambda: self.hashcodes(hashlength)))
+        _, cells = Circle._cells(np.array([self.center[0]]), np.array([self.center[1]]), np.array([self.radius]),
+                                 hashlength)
+        return set(inthash.to_hashcodes(cells, hashlength))
+
+    def _levels(self, max_precision):
+        """classify cells level by level like Polygon._levels, from the coarsest precision whose cells are about
+        the size of the circle down to max_precision. Boundary cells are split at each level.
+        """
+        reach = math.degrees(self.radius / geodesic.EARTH_RADIUS)
+        precision = 1
+        while precision < max_precision and 180.0 / inthash.dimensions(precision + 1)[1] >= 2 * reach:
+            precision += 1
+        lon, lat = self.center
+        _, cells = Circle._cells(np.array([lon]), np.array([lat]), np.array([float(self.radius)]), precision)
+        while True:
+            boxes = inthash.bboxes(cells, precision)
+            w, s, e, n = (boxes[:, i] for i in range(4))
+            # longitudes of the cells relative to the center, so that they do not wrap around the antimeridian
+            west = (w - lon + 180.0) % 360.0 - 180.0
+            east = west + (e - w)
+            widest = geodesic.half_widths(lat, self.radius, s, n)
+            touching = ((west <= widest) & (east >= -widest)) | (widest >= 180.0)
+            # the circle is the narrowest at one end of a band of latitudes, NaN where it does not reach that end
+            narrowest = np.minimum(geodesic.half_widths(lat, self.radius, s, s),
+                                   geodesic.half_widths(lat, self.radius, n, n))
+            inside = (west >= -narrowest) & (east <= narrowest)
+            boundary = touching & ~inside
+            yield precision, cells, inside, boundary, None
+            if precision >= max_precision:
+                return
+            cells, precision = inthash.children(cells[boundary]), precision + 1
+
+    @staticmethod
+    def _cells(lons, lats, radii, precision):
+        """cover the circles centered on (lons[i], lats[i]) with radii[i] at once. The rows of all circles are
+        processed as one batch, and so are the cells of all rows. Returns (circle index, integer geo hash) arrays.
+        """
+        cols, rows = inthash.dimensions(precision)
+        width, height = 360.0 / cols, 180.0 / rows
+        reach = np.degrees(radii / geodesic.EARTH_RADIUS)
+        south = np.clip(np.floor((lats - reach + 90.0) / height), 0, rows - 1).astype(np.int64)
+        north = np.clip(np.floor((lats + reach + 90.0) / height), 0, rows - 1).astype(np.int64)
+        counts = north - south + 1
+        owners = np.repeat(np.arange(len(lats)), counts)
+        ys = np.repeat(south, counts) + concat_ranges(counts)
+
+        spans = geodesic.half_widths(lats[owners], radii[owners], -90.0 + ys * height, -90.0 + (ys + 1) * height)
+        reached = ~np.isnan(spans)
+        owners, ys, spans = owners[reached], ys[reached], spans[reached]
+        first = np.floor((lons[owners] - spans + 180.0) / width).astype(np.int64)
+        last = np.floor((lons[owners] + spans + 180.0) / width).astype(np.int64)
+        whole = last - first + 1 >= cols
+        first[whole], last[whole] = 0, cols - 1
+
+        counts = last - first + 1
+        xs = (np.repeat(first, counts) + concat_ranges(counts)) % cols
+        return np.repeat(owners, counts), inthash.from_xy(xs, np.repeat(ys, counts), precision)
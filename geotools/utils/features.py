@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import codecs
+import csv
+import geohash
+import json
+import struct
+
+from geotools.utils.circle import Circle
+from geotools.utils.hashset import GeohashSet
+from geotools.utils.hashset import MAGIC
+from geotools.utils.path import Path
+from geotools.utils.polygon import MultiPolygon
+from geotools.utils.polygon import Polygon
+
+
+GEOMETRIES = ("Point", "MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon", "GeometryCollection")
+
+
+def read_features(fp, chunk_size=1 << 16):
+    """yield the features of a GeoJSON file one by one, reading it by chunks of chunk_size characters.
+
+    The file may hold a FeatureCollection, a single Feature or geometry, or one of those per line (NDJSON). Only the
+    feature being decoded is held in memory, never the whole collection. Bare geometries come wrapped in a Feature.
+    """
+    scanner = _Scanner(fp, chunk_size)
+    while scanner.skip():
+        if scanner.peek() != "{":
+            yield _feature(scanner.decode())
+            continue
+        scanner.consume("{")
+        members = dict()
+        while scanner.skip() != "}":
+            key = scanner.decode()
+            scanner.skip()
+            scanner.consume(":")
+            scanner.skip()
+            if key == "features" and scanner.peek() == "[":
+                scanner.consume("[")
+                while scanner.skip() != "]":
+                    yield _feature(scanner.decode())
+                    if scanner.skip() == ",":
+                        scanner.consume(",")
+                scanner.consume("]")
+                members[key] = None
+            else:
+                members[key] = scanner.decode()
+            if scanner.skip() == ",":
+                scanner.consume(",")
+        scanner.consume("}")
+        if "features" not in members:
+            yield _feature(members)
+
+
+def read_shapes(fp, radius="radius", chunk_size=1 << 16):
+    """yield (feature, shape) pairs for the features of a GeoJSON file, see read_features.
+
+    Polygons and MultiPolygons give Polygon and MultiPolygon shapes (with their holes), LineStrings give a Path and
+    MultiLineStrings one Path per line. Points give a Circle when the feature has a radius property, in meters.
+    Features without a shape this library can rasterize are skipped.
+    """
+    for feature in read_features(fp, chunk_size):
+        for shape in shapes(feature, radius):
+            yield feature, shape
+
+
+def shapes(feature, radius="radius"):
+    """return the list of shapes of a feature, see read_shapes."""
+    return list(_shapes(feature.get("geometry"), (feature.get("properties") or dict()).get(radius)))
+
+
+def write_cells(fp, results, ndjson=False):
+    """write rasterization results as GeoJSON features, one Polygon feature per geo hash with its bbox as geometry
+    and properties {"geohash": ..., "feature": ...}. results is an iterable of (feature id, geo hashes) pairs, as
+    given by rasterize_many for instance, and is consumed as it is written.
+
+    Writes a FeatureCollection, or one feature per line if ndjson is set.
+    """
+    if ndjson:
+        for feature_id, hashcodes in results:
+            for hashcode in hashcodes:
+                fp.write(json.dumps(cell_feature(hashcode, feature_id)) + "\n")
+        return
+    fp.write('{"type": "FeatureCollection", "features": [')
+    separator = "\n"
+    for feature_id, hashcodes in results:
+        for hashcode in hashcodes:
+            fp.write(separator + json.dumps(cell_feature(hashcode, feature_id)))
+            separator = ",\n"
+    fp.write("\n]}\n")
+
+
+def write_table(fp, results):
+    """write rasterization results as a csv table of geohash,feature rows, see write_cells."""
+    writer = csv.writer(fp, lineterminator="\n")
+    writer.writerow(("geohash", "feature"))
+    for feature_id, hashcodes in results:
+        writer.writerows((hashcode, feature_id) for hashcode in hashcodes)
+
+
+def write_sets(fp, results):
+    """write rasterization results to a binary file: for each (feature id, geo hashes) pair, the feature id as
+    length prefixed JSON then the geo hashes as a serialized GeohashSet. See read_sets."""
+    for feature_id, hashcodes in results:
+        key = json.dumps(feature_id).encode("utf-8")
+        fp.write(struct.pack("<I", len(key)) + key + GeohashSet(hashcodes).to_bytes())
+
+
+def read_sets(fp):
+    """yield the (feature id, GeohashSet) pairs of a binary file written by write_sets."""
+    while True:
+        header = fp.read(4)
+        if not header:
+            return
+        size, = struct.unpack("<I", header)
+        feature_id = json.loads(fp.read(size).decode("utf-8"))
+        prefix = fp.read(len(MAGIC) + 8)
+        count, = struct.unpack_from("<Q", prefix, len(MAGIC))
+        yield feature_id, GeohashSet.from_bytes(prefix + fp.read(8 * count))
+
+
+def cell_feature(hashcode, feature_id=None):
+    """return the GeoJSON feature of a geo hash, its bbox as a Polygon geometry."""
+    bbox = geohash.bbox(hashcode)
+    w, s, e, n = bbox["w"], bbox["s"], bbox["e"], bbox["n"]
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Polygon", "coordinates": [[[w, s], [e, s], [e, n], [w, n], [w, s]]]},
+        "properties": {"geohash": hashcode, "feature": feature_id}
+    }
+
+
+def _feature(value):
+    if not isinstance(value, dict):
+        raise ValueError("expected a GeoJSON object, got {0!r}".format(value))
+    if value.get("type") in GEOMETRIES:
+        return {"type": "Feature", "geometry": value, "properties": dict()}
+    return value
+
+
+def _ring(coordinates):
+    return [(lon, lat) for lon, lat in (position[:2] for position in coordinates)]
+
+
+def _shapes(geometry, radius):
+    if not geometry:
+        return
+    kind, coordinates = geometry.get("type"), geometry.get("coordinates")
+    if kind == "Polygon":
+        yield Polygon(_ring(coordinates[0]), [_ring(hole) for hole in coordinates[1:]])
+    elif kind == "MultiPolygon":
+        yield MultiPolygon([[_ring(ring) for ring in polygon] for polygon in coordinates])
+    elif kind == "LineString":
+        yield Path(_ring(coordinates))
+    elif kind == "MultiLineString":
+        for line in coordinates:
+            yield Path(_ring(line))
+    elif kind == "Point" and radius is not None:
+        yield Circle(tuple(coordinates[:2]), radius)
+    elif kind == "GeometryCollection":
+        for member in geometry.get("geometries", ()):
+            yield from _shapes(member, radius)
+
+
+class _Scanner:
+    """a window over a text (or utf-8 bytes) file, decoding JSON values as soon as they are complete."""
+
+    def __init__(self, fp, chunk_size):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self, size=None):
+        """read the next chunk (of size characters rather than chunk_size if given), return False at the end of the
+        file."""
+        if self._eof:
+            return False
+        chunk = self._fp.read(size or self._chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk, final=not chunk)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def skip(self):
+        """skip white spaces, return the next character or "" at the end of the file."""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position].isspace():
+                self._position += 1
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position:self._position + 1]
+
+    def peek(self):
+        return self._buffer[self._position:self._position + 1]
+
+    def consume(self, character):
+        if self.skip() != character:
+            raise ValueError("expected {0!r} at {1!r}".format(character, self._buffer[self._position:][:40]))
+        self._position += 1
+
+    def decode(self):
+        """decode the JSON value starting at the current position.
+
+        An incomplete value is decoded again from its start once more is read, so the amount read doubles on each
+        attempt: a value of n characters is then decoded about log(n) times, in linear time overall.
+        """
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._fill(size):
+                    size = max(size, len(self._buffer) - self._position) * 2
+                    continue
+                raise
+            # a number may go on in the next chunk
+            if end < len(self._buffer) or not self._fill():
+                self._position = end
+                return value
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""distance kernels shared by distance computations and circle rasterization.
+
+Points are (lon, lat) in degrees and distances are in meters. Every function works on numpy arrays of points but
+distance and destination, which take a single point and run the same formulas on plain floats: numpy calls cost more
+than the math itself for one point.
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+import numpy as np
+import types
+
+
+EARTH_RADIUS = 6372795.0
+# WGS-84 ellipsoid, for the vincenty method
+ELLIPSOID_A = 6378137.0
+ELLIPSOID_F = 1 / 298.257223563
+ELLIPSOID_B = (1 - ELLIPSOID_F) * ELLIPSOID_A
+
+HAVERSINE = "haversine"
+VINCENTY = "vincenty"
+
+# the math functions the kernels use, under their numpy names
+_MATH = types.SimpleNamespace(sin=math.sin, cos=math.cos, tan=math.tan, sqrt=math.sqrt, arcsin=math.asin,
+                              arctan=math.atan, arctan2=math.atan2, minimum=min, abs=abs, all=bool,
+                              where=lambda condition, x, y: x if condition else y,
+                              broadcast_arrays=lambda *values: values)
+
+
+def distances(points0, points1, method=HAVERSINE):
+    """pairwise distances between two arrays of points, or from one point to many when either side is a single point.
+    haversine works on a sphere, vincenty on the WGS-84 ellipsoid: slower but accurate to the millimeter. vincenty
+    does not converge for nearly antipodal points, which get a NaN distance.
+    """
+    lon0, lat0 = _split(points0)
+    lon1, lat1 = _split(points1)
+    if method == HAVERSINE:
+        return _haversine(lon0, lat0, lon1, lat1)
+    if method == VINCENTY:
+        return _vincenty_inverse(lon0, lat0, lon1, lat1)
+    raise ValueError("unknown method {0}".format(method))
+
+
+def distance_matrix(points0, points1, method=HAVERSINE):
+    """distances between every point of points0 (rows) and every point of points1 (columns)."""
+    points0, points1 = np.asarray(points0, dtype=float).reshape(-1, 2), np.asarray(points1, dtype=float).reshape(-1, 2)
+    return distances(points0[:, None, :], points1[None, :, :], method)
+
+
+def destinations(points, distance, bearing, method=HAVERSINE):
+    """points reached when travelling the given distances from points, with the initial bearings in degrees. Returns
+    an array of (lon, lat) with the broadcast shape of the arguments.
+    """
+    lon, lat = _split(points)
+    if method == HAVERSINE:
+        lon, lat = _spherical_direct(lon, lat, np.asarray(distance, dtype=float), np.radians(bearing))
+    elif method == VINCENTY:
+        lon, lat = _vincenty_direct(lon, lat, np.asarray(distance, dtype=float), np.radians(bearing))
+    else:
+        raise ValueError("unknown method {0}".format(method))
+    return np.stack([(np.degrees(lon) + 540) % 360 - 180, np.degrees(lat)], axis=-1)
+
+
+def distance(point0, point1, method=HAVERSINE):
+    """distance between two points, see distances."""
+    lon0, lat0, lon1, lat1 = map(math.radians, (point0[0], point0[1], point1[0], point1[1]))
+    if method == HAVERSINE:
+        return _haversine(lon0, lat0, lon1, lat1, _MATH)
+    if method == VINCENTY:
+        return _vincenty_inverse(lon0, lat0, lon1, lat1, _MATH)
+    raise ValueError("unknown method {0}".format(method))
+
+
+def destination(point, distance, bearing, method=HAVERSINE):
+    """(lon, lat) point reached from point, see destinations."""
+    lon, lat, bearing = math.radians(point[0]), math.radians(point[1]), math.radians(bearing)
+    if method == HAVERSINE:
+        lon, lat = _spherical_direct(lon, lat, float(distance), bearing, _MATH)
+    elif method == VINCENTY:
+        lon, lat = _vincenty_direct(lon, lat, float(distance), bearing, _MATH)
+    else:
+        raise ValueError("unknown method {0}".format(method))
+    return (math.degrees(lon) + 540) % 360 - 180, math.degrees(lat)
+
+
+def _split(points):
+    points = np.asarray(points, dtype=float)
+    return np.radians(points[..., 0]), np.radians(points[..., 1])
+
+
+def _haversine(lon0, lat0, lon1, lat1, xp=np):
+    h = xp.sin((lat1 - lat0) / 2) ** 2 + xp.cos(lat0) * xp.cos(lat1) * xp.sin((lon1 - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS * xp.arcsin(xp.minimum(1.0, xp.sqrt(h)))
+
+
+def _spherical_direct(lon, lat, distance, bearing, xp=np):
+    d = distance / EARTH_RADIUS
+    lat1 = xp.arcsin(xp.sin(lat) * xp.cos(d) + xp.cos(lat) * xp.sin(d) * xp.cos(bearing))
+    return lon + xp.arctan2(xp.sin(bearing) * xp.sin(d) * xp.cos(lat), xp.cos(d) - xp.sin(lat) * xp.sin(lat1)), lat1
+
+
+def _delta_sigma(b, sin_sigma, cos_sigma, cos_2sigma_m):
+    return b * sin_sigma * (cos_2sigma_m + b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+        b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+
+
+def _series(cos2_alpha):
+    """the A and B coefficients of vincenty formulae."""
+    u2 = cos2_alpha * (ELLIPSOID_A ** 2 - ELLIPSOID_B ** 2) / ELLIPSOID_B ** 2
+    a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    return a, b
+
+
+def _vincenty_inverse(lon0, lat0, lon1, lat1, xp=np, iterations=200, tolerance=1e-12):
+    f = ELLIPSOID_F
+    delta = lon1 - lon0
+    u0, u1 = xp.arctan((1 - f) * xp.tan(lat0)), xp.arctan((1 - f) * xp.tan(lat1))
+    sin_u0, cos_u0, sin_u1, cos_u1 = xp.sin(u0), xp.cos(u0), xp.sin(u1), xp.cos(u1)
+    lambda_ = delta
+    converged = False
+    for _ in range(iterations):
+        sin_lambda, cos_lambda = xp.sin(lambda_), xp.cos(lambda_)
+        sin_sigma = xp.sqrt((cos_u1 * sin_lambda) ** 2 + (cos_u0 * sin_u1 - sin_u0 * cos_u1 * cos_lambda) ** 2)
+        cos_sigma = sin_u0 * sin_u1 + cos_u0 * cos_u1 * cos_lambda
+        sigma = xp.arctan2(sin_sigma, cos_sigma)
+        # coincident points have no azimuth, and on the equator cos2_alpha is 0
+        sin_alpha = cos_u0 * cos_u1 * sin_lambda / xp.where(sin_sigma == 0, 1.0, sin_sigma)
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sigma_m = xp.where(cos2_alpha == 0, 0.0,
+                                cos_sigma - 2 * sin_u0 * sin_u1 / xp.where(cos2_alpha == 0, 1.0, cos2_alpha))
+        c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        previous, lambda_ = lambda_, delta + (1 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+        converged = xp.abs(lambda_ - previous) < tolerance
+        if xp.all(converged):
+            break
+    a, b = _series(cos2_alpha)
+    distance = ELLIPSOID_B * a * (sigma - _delta_sigma(b, sin_sigma, cos_sigma, cos_2sigma_m))
+    return xp.where(converged, distance, float("nan"))
+
+
+def _vincenty_direct(lon, lat, distance, bearing, xp=np, iterations=200, tolerance=1e-12):
+    f = ELLIPSOID_F
+    lon, lat, distance, bearing = xp.broadcast_arrays(lon, lat, distance, bearing)
+    sin_alpha1, cos_alpha1 = xp.sin(bearing), xp.cos(bearing)
+    tan_u1 = (1 - f) * xp.tan(lat)
+    cos_u1 = 1 / xp.sqrt(1 + tan_u1 ** 2)
+    sin_u1 = tan_u1 * cos_u1
+    sigma1 = xp.arctan2(tan_u1, cos_alpha1)
+    sin_alpha = cos_u1 * sin_alpha1
+    cos2_alpha = 1 - sin_alpha ** 2
+    a, b = _series(cos2_alpha)
+    sigma = distance / (ELLIPSOID_B * a)
+    for _ in range(iterations):
+        cos_2sigma_m = xp.cos(2 * sigma1 + sigma)
+        previous, sigma = sigma, distance / (ELLIPSOID_B * a) + _delta_sigma(b, xp.sin(sigma), xp.cos(sigma),
+                                                                             cos_2sigma_m)
+        if xp.all(xp.abs(sigma - previous) < tolerance):
+            break
+    sin_sigma, cos_sigma = xp.sin(sigma), xp.cos(sigma)
+    cos_2sigma_m = xp.cos(2 * sigma1 + sigma)
+    x = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+    lat2 = xp.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1, (1 - f) * xp.sqrt(sin_alpha ** 2 + x ** 2))
+    lambda_ = xp.arctan2(sin_sigma * sin_alpha1, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+    c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+    delta = lambda_ - (1 - c) * f * sin_alpha * (
+        sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+    return lon + delta, lat2
+
+
+def half_width(center, distance, south, north):
+    """largest longitude offset (in degrees) from center reached by the circle of given radius between two latitudes,
+    or None if the circle does not reach that latitude band.
+    """
+    width = float(half_widths(center[1], distance, south, north))
+    return None if math.isnan(width) else width
+
+
+def half_widths(lats, distances, souths, norths):
+    """vectorized half_width, over circles centered at latitudes lats: NaN where a circle misses its band."""
+    lat0, d = np.radians(lats), np.asarray(distances, dtype=float) / EARTH_RADIUS
+    south, north = np.maximum(np.radians(souths), lat0 - d), np.minimum(np.radians(norths), lat0 + d)
+    cos_d = np.cos(d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # a circle is the widest at that latitude, and narrows monotonically on both sides of it
+        widest = np.where(cos_d > 0, np.arcsin(np.clip(np.sin(lat0) / cos_d, -1.0, 1.0)), lat0)
+        lat = np.minimum(np.maximum(widest, south), north)
+        denominator = np.cos(lat) * np.cos(lat0)
+        cos_width = (cos_d - np.sin(lat) * np.sin(lat0)) / denominator
+        width = np.where(denominator > 0, np.degrees(np.arccos(np.clip(cos_width, -1.0, 1.0))), 180.0)
+    return np.where(south > north, np.nan, width)
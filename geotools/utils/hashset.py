@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from geotools.utils import inthash
+import numpy as np
+import struct
+
+
+MAX_PRECISION = 12
+MAGIC = b"GHS1"
+
+
+class GeohashSet:
+    """compact set of geo hashes of mixed precisions.
+
+    Each geo hash is packed into a 64 bits id: its bits left aligned on 60 bits, followed by 4 bits of precision.
+    Ids are kept in a sorted numpy array, which orders geo hashes along the z-order curve with parents right before
+    their children. That is 8 bytes per geo hash instead of a python string.
+    """
+
+    def __init__(self, hashcodes=()):
+        ids = [GeohashSet._id(inthash.from_hashcode(hashcode), len(hashcode)) for hashcode in hashcodes]
+        self._ids = np.unique(np.array(ids, dtype=np.uint64))
+
+    @classmethod
+    def from_cells(cls, bits, precision):
+        """build a set from an array of integer geo hashes of the given precision."""
+        return cls._from_ids(GeohashSet._id(np.asarray(bits, dtype=np.int64), precision))
+
+    @classmethod
+    def _from_ids(cls, ids, unique=False):
+        hashset = cls.__new__(cls)
+        hashset._ids = np.asarray(ids, dtype=np.uint64) if unique else np.unique(np.asarray(ids, dtype=np.uint64))
+        return hashset
+
+    @staticmethod
+    def _id(bits, precision):
+        if not 0 < precision <= MAX_PRECISION:
+            raise ValueError("precision must be between 1 and {0:d}".format(MAX_PRECISION))
+        if isinstance(bits, np.ndarray):
+            return (bits.astype(np.uint64) << np.uint64(5 * (MAX_PRECISION - precision) + 4)) | np.uint64(precision)
+        return (bits << 5 * (MAX_PRECISION - precision) + 4) | precision
+
+    def cells(self):
+        """return the content of the set as a list of (precision, array of integer geo hashes), by precision."""
+        precisions = (self._ids & np.uint64(15)).astype(int)
+        return [(precision, ((self._ids[precisions == precision] >> np.uint64(5 * (MAX_PRECISION - precision) + 4))
+                             .astype(np.int64)))
+                for precision in np.unique(precisions).tolist()]
+
+    def covers(self, hashcode):
+        """tell whether the geo hash, or one of its parents, belongs to the set."""
+        bits = inthash.from_hashcode(hashcode)
+        ids = np.array([GeohashSet._id(bits >> 5 * (len(hashcode) - precision), precision)
+                        for precision in range(1, len(hashcode) + 1)], dtype=np.uint64)
+        return bool(np.isin(ids, self._ids, assume_unique=True).any())
+
+    def compact(self):
+        """return the set where every complete set of 32 siblings is replaced by their parent, recursively."""
+        ids = [GeohashSet._id(bits, precision) for precision, bits in inthash.compact(self.cells())]
+        return GeohashSet._from_ids(np.concatenate(ids) if ids else [])
+
+    def expand(self, precision):
+        """yield the geo hashes of the set at the given precision, the coarser ones being replaced by all their
+        descendants. Geo hashes come precision by precision, and only a block of them is held in memory at once.
+        """
+        for cell_precision, bits in self.cells():
+            for descendants in inthash.expand(bits, cell_precision, precision):
+                yield from inthash.to_hashcodes(descendants, precision)
+
+    def union(self, other):
+        return GeohashSet._from_ids(np.union1d(self._ids, other._ids), unique=True)
+
+    def intersection(self, other):
+        return GeohashSet._from_ids(np.intersect1d(self._ids, other._ids, assume_unique=True), unique=True)
+
+    def difference(self, other):
+        return GeohashSet._from_ids(np.setdiff1d(self._ids, other._ids, assume_unique=True), unique=True)
+
+    def to_bytes(self):
+        return MAGIC + struct.pack("<Q", len(self._ids)) + self._ids.astype("<u8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a serialized GeohashSet")
+        count, = struct.unpack_from("<Q", data, len(MAGIC))
+        offset = len(MAGIC) + 8
+        return cls._from_ids(np.frombuffer(data, dtype="<u8", count=count, offset=offset).astype(np.uint64),
+                             unique=True)
+
+    def __contains__(self, hashcode):
+        key = np.uint64(GeohashSet._id(inthash.from_hashcode(hashcode), len(hashcode)))
+        position = np.searchsorted(self._ids, key)
+        return bool(position < len(self._ids) and self._ids[position] == key)
+
+    def __iter__(self):
+        precisions = (self._ids & np.uint64(15)).astype(int)
+        hashcodes = np.empty(len(self._ids), dtype=object)
+        for precision, bits in self.cells():
+            hashcodes[precisions == precision] = inthash.to_hashcodes(bits, precision)
+        return iter(hashcodes.tolist())
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __eq__(self, other):
+        return isinstance(other, GeohashSet) and np.array_equal(self._ids, other._ids)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+
+def compact(hashcodes):
+    """merge every complete set of 32 sibling geo hashes into their parent, recursively. Returns a list ordered as a
+    GeohashSet."""
+    return list(GeohashSet(hashcodes).compact())
+
+
+def expand(hashcodes, precision):
+    """yield the geo hashes of the given precision making up the geo hashes of the iterable, one at a time."""
+    for hashcode in hashcodes:
+        for descendants in inthash.expand(inthash.from_hashcode(hashcode), len(hashcode), precision):
+            yield from inthash.to_hashcodes(descendants, precision)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from geotools.utils import concat_ranges
+from geotools.utils import inthash
+from geotools.utils.hashset import GeohashSet
+import numpy as np
+
+
+class PolygonIndex:
+    """answers "which polygons contain this point?" for many polygons.
+
+    Each polygon is covered with geo hashes between min_precision and max_precision. Cells fully inside a polygon
+    answer the question directly; cells on its boundary (at max_precision) only point at candidates, which are then
+    checked with Polygon.contains.
+    """
+
+    def __init__(self, polygons, min_precision=2, max_precision=7):
+        self._polygons = list(polygons)
+        ids, owners, interior = list(), list(), list()
+        for index, polygon in enumerate(self._polygons):
+            for precision, cells, inside, boundary, _ in polygon._levels(min_precision, max_precision):
+                for mask, flag in ((inside, True), (boundary if precision == max_precision else None, False)):
+                    if mask is None or not mask.any():
+                        continue
+                    ids.append(GeohashSet._id(cells[mask], precision))
+                    owners.append(np.full(np.count_nonzero(mask), index))
+                    interior.append(np.full(np.count_nonzero(mask), flag))
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.uint64)
+        order = np.argsort(ids, kind="stable")
+        self._ids = ids[order]
+        self._owners = np.concatenate(owners)[order] if owners else np.zeros(0, dtype=int)
+        self._interior = np.concatenate(interior)[order] if interior else np.zeros(0, dtype=bool)
+        self._precisions = np.unique(self._ids & np.uint64(15)).astype(int).tolist()
+
+    def query(self, point):
+        """return the indexes of the polygons containing the point, in increasing order."""
+        return self.query_many([point[0]], [point[1]])[0]
+
+    def query_many(self, lons, lats):
+        """batched query: return, for each point (lons[i], lats[i]), the indexes of the polygons containing it."""
+        lons, lats = np.asarray(lons, dtype=float).ravel(), np.asarray(lats, dtype=float).ravel()
+        points, entries = list(), list()
+        for precision in self._precisions:
+            ids = GeohashSet._id(inthash.encode_many(lons, lats, precision), precision)
+            first = np.searchsorted(self._ids, ids, side="left")
+            counts = np.searchsorted(self._ids, ids, side="right") - first
+            points.append(np.repeat(np.arange(len(ids)), counts))
+            entries.append(np.repeat(first, counts) + concat_ranges(counts))
+        points = np.concatenate(points) if points else np.zeros(0, dtype=int)
+        entries = np.concatenate(entries) if entries else np.zeros(0, dtype=int)
+
+        # interior cells are answers, boundary cells need an exact check, polygon by polygon
+        hits = self._interior[entries]
+        owners = self._owners[entries]
+        for owner in np.unique(owners[~hits]).tolist():
+            candidates = np.flatnonzero(~hits & (owners == owner))
+            hits[candidates] = self._polygons[owner].contains_many(lons[points[candidates]], lats[points[candidates]])
+
+        results = [list() for _ in range(len(lons))]
+        order = np.lexsort((owners[hits], points[hits]))
+        for point, owner in zip(points[hits][order].tolist(), owners[hits][order].tolist()):
+            if not results[point] or results[point][-1] != owner:
+                results[point].append(owner)
+        return results
+
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""integer geo hashes.
+
+A geo hash of precision p is handled as the 5 * p bits its base32 characters stand for: longitude and latitude bits
+are interleaved, starting with a longitude bit. Walking the grid, splitting or merging cells then boils down to bit
+operations, and hashcodes only need to be converted back to strings at output.
+
+Unless stated otherwise, functions accept python ints as well as numpy int64 arrays of bits.
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Christophe
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from geotools.utils import BASE
+import geohash
+import numpy as np
+
+
+BASE_INDEX = dict((c, i) for i, c in enumerate(BASE))
+BASE_CODES = np.frombuffer(BASE.encode("ascii"), dtype=np.uint8)
+
+
+def _spread(v):
+    """insert a zero bit between each of the 32 lower bits of v."""
+    v &= 0x00000000FFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+
+def _squash(v):
+    """reverse of _spread: gather the even bits of v."""
+    v &= 0x5555555555555555
+    v = (v | (v >> 1)) & 0x3333333333333333
+    v = (v | (v >> 2)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v >> 4)) & 0x00FF00FF00FF00FF
+    v = (v | (v >> 8)) & 0x0000FFFF0000FFFF
+    return (v | (v >> 16)) & 0x00000000FFFFFFFF
+
+
+def dimensions(precision):
+    """return the number of columns and rows of the grid of geo hashes at the given precision."""
+    return 1 << (5 * precision + 1) // 2, 1 << 5 * precision // 2
+
+
+def encode(lon, lat, precision):
+    return geohash.encode_uint64(lat, lon) >> (64 - 5 * precision)  # beware: lat, lon
+
+
+def encode_many(lons, lats, precision):
+    """vectorized encode: return the integer geo hashes of the points (lons[i], lats[i]) as an int64 array."""
+    cols, rows = dimensions(precision)
+    # divide before shifting the origin, so that rounding does not move points close to 0 to the next cell
+    x = np.floor(np.asarray(lons, dtype=float) / (360.0 / cols)).astype(np.int64) + cols // 2
+    y = np.floor(np.asarray(lats, dtype=float) / (180.0 / rows)).astype(np.int64) + rows // 2
+    return from_xy(x % cols, np.clip(y, 0, rows - 1), precision)
+
+
+def from_hashcode(hashcode):
+    bits = 0
+    for c in hashcode:
+        bits = (bits << 5) | BASE_INDEX[c]
+    return bits
+
+
+def to_hashcode(bits, precision):
+    return "".join(BASE[(bits >> 5 * (precision - 1 - i)) & 31] for i in range(precision))
+
+
+def to_hashcodes(bits, precision):
+    """vectorized to_hashcode: return the list of geo hashes of an array of bits."""
+    codes = BASE_CODES[(np.asarray(bits, dtype=np.int64).reshape(-1, 1) >> 5 * np.arange(precision - 1, -1, -1)) & 31]
+    return np.ascontiguousarray(codes).view("S{0:d}".format(precision)).ravel().astype(str).tolist()
+
+
+def xy(bits, precision):
+    """return the column (west to east) and row (south to north) of the geo hash in the grid at its precision."""
+    odd = (5 * precision) % 2  # the last bit is a longitude bit when the bit count is odd
+    return _squash(bits >> (1 - odd)), _squash(bits >> odd)
+
+
+def from_xy(x, y, precision):
+    odd = (5 * precision) % 2
+    return (_spread(x) << (1 - odd)) | (_spread(y) << odd)
+
+
+def parent(bits):
+    return bits >> 5
+
+
+def children(bits):
+    """return the 32 geo hashes this geohash can be divided into, in base32 order."""
+    if isinstance(bits, np.ndarray):
+        return ((bits[:, None] << 5) | np.arange(32)).ravel()
+    return range(bits << 5, (bits << 5) + 32)
+
+
+def expand(bits, precision, target, block=1 << 16):
+    """yield the descendants at the target precision of an array of geo hashes, in order, as arrays of at most block
+    geo hashes (or of the descendants of a single geo hash, if it has fewer)."""
+    shift = 5 * (target - precision)
+    if shift < 0:
+        raise ValueError("cannot expand geo hashes to a lower precision")
+    bits = np.atleast_1d(np.asarray(bits, dtype=np.int64))
+    count = 1 << shift
+    step = max(1, block // count)
+    for start in range(0, len(bits), step):
+        firsts = bits[start:start + step] << shift
+        if count <= block:
+            yield (firsts[:, None] + np.arange(count, dtype=np.int64)).ravel()
+            continue
+        for first in firsts.tolist():
+            for offset in range(0, count, block):
+                yield np.arange(first + offset, first + min(count, offset + block), dtype=np.int64)
+
+
+def compact(cells):
+    """merge every complete set of 32 siblings into their parent, recursively. cells is a list of (precision, array of
+    geo hashes) pairs, as returned by GeohashSet.cells, and so is the result."""
+    levels = dict((precision, np.unique(np.asarray(bits, dtype=np.int64))) for precision, bits in cells)
+    for precision in range(max(levels, default=1), 1, -1):
+        bits = levels.get(precision)
+        if bits is None or len(bits) < 32:
+            continue
+        parents, counts = np.unique(bits >> 5, return_counts=True)
+        full = parents[counts == 32]
+        if len(full):
+            levels[precision] = bits[~np.isin(bits >> 5, full)]
+            levels[precision - 1] = np.union1d(levels.get(precision - 1, full[:0]), full)
+    return [(precision, levels[precision]) for precision in sorted(levels) if len(levels[precision])]
+
+
+def adjacent(bits, precision, direction):
+    """return the neighbour of the geo hash in the given direction. Longitudes wrap around the antimeridian,
+    there is no neighbour beyond the poles.
+    """
+    cols, rows = dimensions(precision)
+    x, y = xy(bits, precision)
+    if direction == 'n':
+        if y + 1 >= rows:
+            return None
+        y += 1
+    elif direction == 's':
+        if not y:
+            return None
+        y -= 1
+    elif direction == 'e':
+        x = (x + 1) % cols
+    elif direction == 'w':
+        x = (x - 1) % cols
+    else:
+        raise ValueError('Invalid direction')
+    return from_xy(x, y, precision)
+
+
+def bbox(bits, precision):
+    w, s, e, n = _bounds(bits, precision)
+    return {"w": w, "s": s, "e": e, "n": n}
+
+
+def bboxes(bits, precision):
+    """vectorized bbox: return the bboxes of an array of bits as rows of [w, s, e, n]."""
+    return np.stack(_bounds(np.asarray(bits, dtype=np.int64), precision), axis=-1).reshape(-1, 4)
+
+
+def _bounds(bits, precision):
+    cols, rows = dimensions(precision)
+    width, height = 360.0 / cols, 180.0 / rows
+    x, y = xy(bits, precision)
+    return -180.0 + x * width, -90.0 + y * height, -180.0 + (x + 1) * width, -90.0 + (y + 1) * height
@@ -22,7 +22,14 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import collections
+
 from geotools.utils import *
+from geotools.utils import geodesic
+from geotools.utils import inthash
+from geotools.utils.cache import HashcodeCache
+from geotools.utils.hashset import GeohashSet
+import numpy as np
 
 
 class Path:
@@ -32,36 +39,183 @@ class Path:
             raise ValueError("must have at least two way points on the path")
         self._path = path
 
-    def hashes(self, precision=DEFAULT_PRECISION):
+    def hashes(self, precision=DEFAULT_PRECISION, cache=None):
         """return set of geo hashes along the path with the specified geo hash length
         """
+        if cache is not None:
+            return cache.fetch(HashcodeCache.key("path", self._path, precision), lambda: self.hashes(precision))
         return Path._hashes(self._path, precision)
 
+    def buffer_hashes(self, distance, precision=DEFAULT_PRECISION, cache=None):
+        """return the GeohashSet of the geo hashes within distance meters of the path. Cells lying wholly in the
+        corridor are kept as coarse as possible, the ones crossing its edge are refined down to precision.
+        """
+        if cache is not None:
+            key = HashcodeCache.key("corridor", self._path, distance, precision)
+            return GeohashSet(cache.fetch(key, lambda: self.buffer_hashes(distance, precision)))
+        segments = np.array([(p0[0], p0[1], p1[0], p1[1]) for p0, p1 in zip(self._path, self._path[1:])],
+                            dtype=float)
+        # bounding boxes of the corridor around each segment, to skip the distance math on cells out of reach
+        margin = np.degrees(distance / geodesic.EARTH_RADIUS)
+        polar = np.minimum(np.abs(segments[:, 1::2]).max(axis=1) + margin, 90.0)
+        widths = np.minimum(margin / np.maximum(np.cos(np.radians(polar)), 1e-12), 360.0)
+        reach = np.stack([segments[:, 0::2].min(axis=1) - widths, segments[:, 1::2].min(axis=1) - margin,
+                          segments[:, 0::2].max(axis=1) + widths, segments[:, 1::2].max(axis=1) + margin], axis=1)
+        cells = np.arange(32, dtype=np.int64)
+        pairs = np.repeat(np.arange(32), len(segments)), np.tile(np.arange(len(segments)), 32)
+        ids = []
+        for level in range(1, precision + 1):
+            boxes = inthash.bboxes(cells, level)
+            cell_boxes, reach_boxes = Path._wrap(boxes[pairs[0]], segments[pairs[1], 0]), reach[pairs[1]]
+            overlap = (reach_boxes[:, 0] <= cell_boxes[:, 2]) & (reach_boxes[:, 2] >= cell_boxes[:, 0]) & \
+                      (reach_boxes[:, 1] <= cell_boxes[:, 3]) & (reach_boxes[:, 3] >= cell_boxes[:, 1])
+            pairs = pairs[0][overlap], pairs[1][overlap]
+            near, within = Path._reach(segments[pairs[1]], cell_boxes[overlap], distance)
+            inside = np.zeros(len(cells), dtype=bool)
+            inside[pairs[0][within]] = True
+            boundary = np.zeros(len(cells), dtype=bool)
+            boundary[pairs[0][near]] = True
+            boundary &= ~inside
+            if level == precision:
+                inside |= boundary
+            ids.append(GeohashSet._id(cells[inside], level))
+            if level == precision or not boundary.any():
+                break
+            # only the segments near a boundary cell can reach its children
+            keep = near & boundary[pairs[0]]
+            rank = np.cumsum(boundary) - 1
+            pairs = inthash.children(rank[pairs[0][keep]]), np.repeat(pairs[1][keep], 32)
+            cells = inthash.children(cells[boundary])
+        return GeohashSet._from_ids(np.concatenate(ids))
+
+    @staticmethod
+    def _wrap(boxes, lons):
+        """shift the boxes by whole turns so that their west sides lie within 180 degrees of lons, as Circle._levels
+        does, so that corridors reach across the antimeridian."""
+        shift = 360.0 * np.floor((boxes[:, 0] - lons + 180.0) / 360.0)
+        return boxes - np.stack([shift, np.zeros_like(shift), shift, np.zeros_like(shift)], axis=1)
+
+    @staticmethod
+    def _reach(segments, boxes, distance):
+        """for each (segment, box) row, tell whether some of the box is within distance meters of the segment,
+        and whether all of it is. Distances are measured on a local equirectangular projection whose longitude
+        scale is taken at the latitude farthest from (resp. closest to) the equator, so both answers err on the
+        side of refining the cell.
+        """
+        w, s, e, n = (boxes[:, i] for i in range(4))
+        x0, y0, x1, y1 = (segments[:, i] for i in range(4))
+        lats = np.abs(np.stack([s, n, y0, y1]))
+        equator = (np.minimum(s, np.minimum(y0, y1)) <= 0) & (np.maximum(n, np.maximum(y0, y1)) >= 0)
+        far = np.cos(np.radians(lats.max(axis=0)))
+        close = np.where(equator, 1.0, np.cos(np.radians(lats.min(axis=0))))
+        corners = ((w, s), (e, s), (e, n), (w, n))
+        meters = np.radians(geodesic.EARTH_RADIUS)
+
+        def scaled(scale, lon, lat):
+            return (lon - x0) * scale * meters, (lat - y0) * meters
+
+        # the box is wholly within reach when its corners all are, the corridor around a segment being convex
+        ax, ay = scaled(close, x1, y1)
+        farthest = np.max([Path._segment_distances(*scaled(close, lon, lat), ax, ay) for lon, lat in corners], axis=0)
+        # otherwise the closest points are a corner of the box or an end of the segment, unless they cross
+        ax, ay = scaled(far, x1, y1)
+        bx, by = scaled(far, w, s)
+        cx, cy = scaled(far, e, n)
+        closest = np.min([Path._segment_distances(*scaled(far, lon, lat), ax, ay) for lon, lat in corners] +
+                         [np.hypot(np.maximum(np.maximum(bx - x, 0), x - cx), np.maximum(np.maximum(by - y, 0), y - cy))
+                          for x, y in ((0, 0), (ax, ay))], axis=0)
+        closest[crosses_boxes(segments, boxes)] = 0
+        return closest <= distance, farthest <= distance
+
+    @staticmethod
+    def _segment_distances(px, py, ax, ay):
+        """distances from the points (px, py) to the segments from (0, 0) to (ax, ay)."""
+        length = ax * ax + ay * ay
+        t = np.clip(np.divide(px * ax + py * ay, length, out=np.zeros_like(length), where=length > 0), 0, 1)
+        return np.hypot(px - t * ax, py - t * ay)
+
     @staticmethod
     def _hashes(path, precision=DEFAULT_PRECISION):
-        if len(path) == 2:
-            line = path
-            curr_hash = geohash.encode(longitude=line[0][0], latitude=line[0][1], precision=precision)
-            dest_hash = geohash.encode(longitude=line[1][0], latitude=line[1][1], precision=precision)
-            hashes = {dest_hash: None}
-            n, e, w, s = True, True, True, True
-            while curr_hash != dest_hash:
-                hashes[curr_hash] = None
-                bbox0 = geohash.bbox(curr_hash)
-                line0 = ((bbox0["w"], bbox0["s"]), (bbox0["e"], bbox0["s"]))
-                line1 = ((bbox0["e"], bbox0["s"]), (bbox0["e"], bbox0["n"]))
-                line2 = ((bbox0["e"], bbox0["n"]), (bbox0["w"], bbox0["n"]))
-                if s and intersects(line, line0):
-                    curr_hash, n = south(curr_hash), False
-                elif e and intersects(line, line1):
-                    curr_hash, w = east(curr_hash), False
-                elif n and intersects(line, line2):
-                    curr_hash, s = north(curr_hash), False
-                else:
-                    curr_hash, e = west(curr_hash), False
+        return [inthash.to_hashcode(bits, precision) for bits in Path._cells(path, precision)]
+
+    @staticmethod
+    def _cells(path, precision=DEFAULT_PRECISION):
+        """same as _hashes, with integer geo hashes."""
+        cells = {}
+        for i in range(len(path) - 1):
+            for x, y in Path._traverse(path[i], path[i + 1], precision):
+                cells[inthash.from_xy(x, y, precision)] = None
+        return list(cells.keys())
+
+    @staticmethod
+    def _traverse(point0, point1, precision):
+        """yield the (column, row) of the cells crossed by the segment, from point0 to point1. The grid is walked
+        one cell at a time, each step going to the vertical or horizontal grid line the segment crosses first
+        (Amanatides & Woo)."""
+        cols, rows = inthash.dimensions(precision)
+        x, y = inthash.xy(inthash.encode(point0[0], point0[1], precision), precision)
+        x1, y1 = inthash.xy(inthash.encode(point1[0], point1[1], precision), precision)
+        u0, v0 = (point0[0] + 180) * cols / 360, (point0[1] + 90) * rows / 180
+        du, dv = (point1[0] + 180) * cols / 360 - u0, (point1[1] + 90) * rows / 180 - v0
+        step_x, step_y = (1 if x1 > x else -1), (1 if y1 > y else -1)
+        # t (0 at point0, 1 at point1) of the next grid line crossed, and t between two grid lines
+        t_x = (x + (step_x > 0) - u0) / du if du else float("inf")
+        t_y = (y + (step_y > 0) - v0) / dv if dv else float("inf")
+        dt_x = abs(1 / du) if du else 0
+        dt_y = abs(1 / dv) if dv else 0
+        remaining_x, remaining_y = abs(x1 - x), abs(y1 - y)
+        yield x, y
+        while remaining_x or remaining_y:
+            if remaining_x and (not remaining_y or t_x <= t_y):
+                x, t_x, remaining_x = x + step_x, t_x + dt_x, remaining_x - 1
+            else:
+                y, t_y, remaining_y = y + step_y, t_y + dt_y, remaining_y - 1
+            yield x, y
+
+
+class PathStream:
+    """incremental Path.hashes, for tracks that arrive point by point: each way point pushed returns the geo hashes
+    of the new segment that were not seen recently. Only the last `window` cells are remembered, so a cell the track
+    comes back to after that may be emitted again.
+
+    push and extend never block, so they can be called from a generator as well as from an asyncio consumer loop.
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION, window=1024):
+        if window < 1:
+            raise ValueError("window must hold at least one cell")
+        self._precision = precision
+        self._window = window
+        self._seen = collections.OrderedDict()
+        self._last = None
+
+    def push(self, point):
+        """add a way point and return the list of new geo hashes."""
+        if self._last is None:
+            cells = [inthash.xy(inthash.encode(point[0], point[1], self._precision), self._precision)]
         else:
-            hashes = dict((key, None) for key in Path.hashes(path[0:2], precision))
-            hashes.update(dict((key, None) for key in Path.hashes(path[1:], precision)))
+            cells = Path._traverse(self._last, point, self._precision)
+        self._last = point
+        hashcodes = []
+        for x, y in cells:
+            bits = inthash.from_xy(x, y, self._precision)
+            if bits in self._seen:
+                self._seen.move_to_end(bits)
+                continue
+            self._seen[bits] = None
+            if len(self._seen) > self._window:
+                self._seen.popitem(last=False)
+            hashcodes.append(inthash.to_hashcode(bits, self._precision))
+        return hashcodes
 
-        return list(hashes.keys())
+    def extend(self, points):
+        """add a chunk of way points and return the list of new geo hashes."""
+        hashcodes = []
+        for point in points:
+            hashcodes.extend(self.push(point))
+        return hashcodes
 
+    def stream(self, points):
+        """yield the new geo hashes as the way points of the iterable arrive."""
+        for point in points:
+            yield from self.push(point)
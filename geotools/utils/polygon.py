@@ -23,29 +23,163 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 from geotools.utils import *
+from geotools.utils import budget
+from geotools.utils import inthash
+from geotools.utils.cache import HashcodeCache
+from geotools.utils.hashset import GeohashSet
 import geohash
+import math
+import numpy as np
+import time
+
+
+# tolerance of the simplification, as a fraction of the smallest side of the cells at max precision
+SIMPLIFICATION = 0.125
+
+
+class LevelStats:
+    """what one precision level of a rasterization went through, see the stats option of Polygon.hashcodes.
+
+    candidates cells were classified into inside, boundary and outside ones. edge_tests is the number of (cell, edge)
+    intersection tests (in scanline mode, of cells the edges pass through) and point_tests the number of points
+    located in the polygon, seconds the time spent classifying the level and emitted the number of geo hashes it
+    added to the result.
+    """
+    __slots__ = ("precision", "candidates", "inside", "boundary", "edge_tests", "point_tests", "seconds", "emitted")
+
+    def __init__(self, precision, candidates, inside, boundary, edge_tests, point_tests, seconds, emitted=0):
+        self.precision = precision
+        self.candidates = candidates
+        self.inside = inside
+        self.boundary = boundary
+        self.edge_tests = edge_tests
+        self.point_tests = point_tests
+        self.seconds = seconds
+        self.emitted = emitted
+
+    @property
+    def outside(self):
+        return self.candidates - self.inside - self.boundary
+
+    def as_dict(self):
+        return dict(((key, getattr(self, key)) for key in self.__slots__), outside=self.outside)
+
+    def __repr__(self):
+        return "LevelStats({0})".format(", ".join("{0}={1!r}".format(key, value)
+                                                  for key, value in sorted(self.as_dict().items())))
+
+
+class RasterStats(list):
+    """the LevelStats of a rasterization, level by level: give it as the stats callback of Polygon.hashcodes."""
+
+    def __call__(self, level):
+        self.append(level)
+
+    def totals(self):
+        """sum the counters of all levels."""
+        keys = ("candidates", "inside", "boundary", "outside", "edge_tests", "point_tests", "seconds", "emitted")
+        return dict((key, sum(getattr(level, key) for level in self)) for key in keys)
+
+    def __str__(self):
+        lines = ["precision  candidates      inside    boundary     outside  edge tests point tests     emitted"
+                 "    seconds"]
+        for level in self:
+            lines.append("{0:>9d} {1:>11d} {2:>11d} {3:>11d} {4:>11d} {5:>11d} {6:>11d} {7:>11d} {8:>10.4f}".format(
+                level.precision, level.candidates, level.inside, level.boundary, level.outside, level.edge_tests,
+                level.point_tests, level.emitted, level.seconds))
+        return "\n".join(lines)
 
 
 class Polygon:
 
-    def __init__(self, coordinates):
+    def __init__(self, coordinates, holes=None):
         """return bounding box that contains the polygon as an array of [minLon, minLat, maxLon, maxLat]
+
+        holes are rings cut out of the polygon. All rings are classified together with the even-odd rule: a point
+        is inside when a ray cast from it crosses an odd number of edges, whatever ring they belong to.
         """
-        if len(coordinates) < 3:
-            raise ValueError("a polygon must have at least three points")
         self._coordinates = coordinates
+        self._rings = [coordinates] + list(holes or [])
         self._bbox = dict()
-        for lon, lat in coordinates:
-            validate(lon, lat)
-            # basically the algorithm can go into an endless loop. Best to avoid the poles.
-            if lat < -89.75 or lat > 89.75:
-                raise ValueError("please stay away from the north pole or the south pole; there are some known issues there. Besides, nothing there but snow and ice.")
-            self._bbox = {
-                "w": lon if "w" not in self._bbox else min(lon, self._bbox["w"]),
-                "s": lat if "s" not in self._bbox else min(lat, self._bbox["s"]),
-                "e": lon if "e" not in self._bbox else max(lon, self._bbox["e"]),
-                "n": lat if "n" not in self._bbox else max(lat, self._bbox["n"])
-            }
+        for ring in self._rings:
+            if len(ring) < 3:
+                raise ValueError("a polygon must have at least three points")
+            for lon, lat in ring:
+                validate(lon, lat)
+                avoid_poles(lat)
+                self._bbox = {
+                    "w": lon if "w" not in self._bbox else min(lon, self._bbox["w"]),
+                    "s": lat if "s" not in self._bbox else min(lat, self._bbox["s"]),
+                    "e": lon if "e" not in self._bbox else max(lon, self._bbox["e"]),
+                    "n": lat if "n" not in self._bbox else max(lat, self._bbox["n"])
+                }
+        self._index_edges()
+
+    def _index_edges(self):
+        """split the latitude range of the polygon into horizontal slabs and register each edge into every slab its
+        latitude range overlaps. Predicates then only walk the edges of the slabs they actually touch.
+        """
+        self._edges = list()
+        for ring in self._rings:
+            prev = ring[-1]
+            for curr in ring:
+                self._edges.append((prev, curr))
+                prev = curr
+        self._slab_count = max(1, int(math.sqrt(len(self._edges))))
+        self._slab_height = (self._bbox["n"] - self._bbox["s"]) / self._slab_count
+        self._slabs = [list() for _ in range(self._slab_count)]
+        for edge in self._edges:
+            (_, lat0), (_, lat1) = edge
+            for slab in range(self._slab(min(lat0, lat1)), self._slab(max(lat0, lat1)) + 1):
+                self._slabs[slab].append(edge)
+        self._edge_array = np.array([prev + curr for prev, curr in self._edges], dtype=float)
+        # same slabs as arrays of [prev_lon, prev_lat, curr_lon, curr_lat] rows for batch predicates
+        self._slab_arrays = [np.array([prev + curr for prev, curr in slab], dtype=float).reshape(-1, 4)
+                             for slab in self._slabs]
+        self._simplifications = dict()
+
+    def _slab(self, lat):
+        if not self._slab_height:
+            return 0
+        return min(max(int((lat - self._bbox["s"]) / self._slab_height), 0), self._slab_count - 1)
+
+    def _edges_between(self, south, north):
+        """return the edges whose latitude range may overlap [south, north]."""
+        if north < self._bbox["s"] or south > self._bbox["n"]:
+            return []
+        first, last = self._slab(south), self._slab(north)
+        if first == last:
+            return self._slabs[first]
+        edges = dict()
+        for slab in range(first, last + 1):
+            edges.update((id(edge), edge) for edge in self._slabs[slab])
+        return edges.values()
+
+    def _simplified(self, tolerance):
+        """return the edges of the rings simplified with Douglas-Peucker: every dropped vertex lies within tolerance
+        degrees of the simplified edge replacing it, so the actual rings never stray further than that from them.
+        Each ring keeps at least its first vertex and the one farthest from it.
+        """
+        if tolerance not in self._simplifications:
+            edges = list()
+            for ring in self._rings:
+                points = np.array([point[:2] for point in ring] + [ring[0][:2]], dtype=float)
+                farthest = int(np.argmax(np.hypot(*(points[:-1] - points[0]).T)))
+                kept = [0, len(ring)] + ([farthest] if farthest else [])
+                spans = [(0, farthest), (farthest, len(ring))] if farthest else [(0, len(ring))]
+                while spans:
+                    first, last = spans.pop()
+                    if last - first < 2:
+                        continue
+                    deviations = _segment_distances(points[first + 1:last], points[first], points[last])
+                    worst = int(np.argmax(deviations))
+                    if deviations[worst] > tolerance:
+                        kept.append(first + 1 + worst)
+                        spans.extend(((first, first + 1 + worst), (first + 1 + worst, last)))
+                kept = points[np.unique(kept)]
+                edges.append(np.hstack([kept[:-1], kept[1:]]))
+            self._simplifications[tolerance] = np.vstack(edges)
+        return self._simplifications[tolerance]
 
     def bbox(self):
         return self._bbox
@@ -56,17 +190,55 @@ class Polygon:
                 http://www.ecse.rpi.edu/Homepages/wrf/Research/Short_Notes/pnpoly.html
         """
         inside = False
-        prev = self._coordinates[-1]
-        for curr in self._coordinates:
+        for prev, curr in self._edges_between(point[1], point[1]):
             if ((curr[1] > point[1]) != (prev[1] > point[1])) \
                     and (point[0] < (prev[0] - curr[0]) * (point[1] - curr[1]) / (prev[1] - curr[1]) + curr[0]):
                 inside = not inside
-            prev = curr
+        return inside
+
+    def contains_many(self, lons, lats):
+        """vectorized version of contains: return a boolean mask telling which of the points (lons[i], lats[i]) are
+        inside the polygon. The ray-casting is the same as in contains, so both agree on boundaries and vertices.
+        """
+        lons, lats = np.broadcast_arrays(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        shape = lons.shape
+        lons, lats = lons.ravel(), lats.ravel()
+        inside = np.zeros(lons.shape, dtype=bool)
+
+        candidates = np.flatnonzero((lats >= self._bbox["s"]) & (lats <= self._bbox["n"]))
+        if self._slab_height:
+            slabs = np.minimum(((lats[candidates] - self._bbox["s"]) / self._slab_height).astype(int),
+                               self._slab_count - 1)
+        else:
+            slabs = np.zeros(candidates.shape, dtype=int)
+        order = np.argsort(slabs, kind="stable")
+        candidates, slabs = candidates[order], slabs[order]
+        starts = np.flatnonzero(np.diff(slabs, prepend=-1))
+        for slab, points in zip(slabs[starts], np.split(candidates, starts[1:])):
+            inside[points] = self._ray_cast(lons[points], lats[points], self._slab_arrays[slab])
+        return inside.reshape(shape)
+
+    @staticmethod
+    def _ray_cast(x, y, edges, block=1 << 20):
+        """count, for each point, the edges crossed by a ray cast eastward. Points are processed by chunks so that
+        at most `block` point/edge pairs are held in memory at once.
+        """
+        inside = np.zeros(x.shape, dtype=bool)
+        if not len(edges):
+            return inside
+        px, py, cx, cy = (edges[:, i] for i in range(4))
+        step = max(1, block // len(edges))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for start in range(0, len(x), step):
+                bx, by = x[start:start + step, None], y[start:start + step, None]
+                crossing = ((cy > by) != (py > by)) & (bx < (px - cx) * (by - cy) / (py - cy) + cx)
+                inside[start:start + step] = np.count_nonzero(crossing, axis=1) % 2 == 1
         return inside
 
     def intersects(self, bbox):
-        prev = self._coordinates[-1]
-        for curr in self._coordinates:  # Walk the edges of the polygon
+        for prev, curr in self._edges_between(bbox["s"], bbox["n"]):  # Walk the edges of the polygon near the bbox
+            if max(prev[0], curr[0]) < bbox["w"] or min(prev[0], curr[0]) > bbox["e"]:
+                continue
             if intersects(((bbox["w"], bbox["s"]), (bbox["e"], bbox["s"])), (prev, curr)):
                 return True
             if intersects(((bbox["e"], bbox["s"]), (bbox["e"], bbox["n"])), (prev, curr)):
@@ -75,22 +247,28 @@ class Polygon:
                 return True
             if intersects(((bbox["w"], bbox["n"]), (bbox["w"], bbox["s"])), (prev, curr)):
                 return True
-            prev = curr
         return False
 
-    def qcover(self, min_precision=2, max_precision=DEFAULT_PRECISION):
-        return self.hashcodes(min_precision, max_precision, cover=True, quick=True)
+    def qcover(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, cover=True, quick=True, cache=cache)
+
+    def cover(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, cover=True, cache=cache)
 
-    def cover(self, min_precision=2, max_precision=DEFAULT_PRECISION):
-        return self.hashcodes(min_precision, max_precision, cover=True)
+    def qfill(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, quick=True, cache=cache)
 
-    def qfill(self, min_precision=2, max_precision=DEFAULT_PRECISION):
-        return self.hashcodes(min_precision, max_precision, quick=True)
+    def fill(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, cache=cache)
 
-    def fill(self, min_precision=2, max_precision=DEFAULT_PRECISION):
-        return self.hashcodes(min_precision, max_precision)
+    def scover(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, cover=True, cache=cache, scanline=True)
 
-    def hashcodes(self, min_precision=2, max_precision=DEFAULT_PRECISION, cover=False, quick=False):
+    def sfill(self, min_precision=2, max_precision=DEFAULT_PRECISION, cache=None):
+        return self.hashcodes(min_precision, max_precision, cache=cache, scanline=True)
+
+    def hashcodes(self, min_precision=2, max_precision=DEFAULT_PRECISION, cover=False, quick=False, cache=None,
+                  simplify=False, compact=False, stats=None, max_cells=None, timeout=None, scanline=False):
         """fills or covers the polygon with geo hashes.
         In fill mode, if a geohash partially falls outside the polygon, it is omitted.
 
@@ -98,38 +276,279 @@ class Polygon:
 
         We're not aiming for perfect detail here in terms of 'pixellation', going beyond 9 doesn't serve much purpose.
         2 chars zone area almost covers france. It is a good start for Russia, China, US...
+
+        Each precision level is processed as one batch: the bboxes of all candidates are decoded into arrays and
+        classified at once, then only boundary cells are decomposed into their 32 children.
+
+        If a HashcodeCache is given, results are looked up there first and stored there once computed.
+
+        With simplify, the edges are first simplified with a tolerance of a fraction of the cells at max_precision
+        (see SIMPLIFICATION), which speeds up rings with far more vertices than the cells can resolve. Cells within
+        the tolerance of a simplified edge are taken as boundary cells, so a cover never misses a cell (it may get a
+        few more along the boundary) and a fill never gets a cell that is not inside. Quick mode ignores it.
+
+        With compact, complete sets of 32 sibling geo hashes are merged into their parent, recursively.
+
+        stats is called with the LevelStats of each precision level as soon as it is done; a RasterStats gathers
+        them. Nothing is measured without it, and nothing is reported when the result comes from the cache.
+
+        max_cells and timeout (in seconds) bound the work: levels are refined breadth first, and refinement stops
+        before either is exceeded (see budget.refine), leaving a valid cover or fill at mixed precision. Budgeted
+        results are neither cached nor reported to stats.
+
+        With scanline, levels are classified by rasterizing the edges onto the grid and filling rows by parity instead
+        of testing cells against edges and points (see _scan_classify). It is exact as well and gives the same geo
+        hashes. It cannot be combined with quick.
         """
         max_precision = min(max_precision, DEFAULT_PRECISION)
-        polygon_bbox = self.bbox()
+        if quick and scanline:
+            raise ValueError("quick and scanline modes are exclusive")
+        if compact:
+            return list(GeohashSet(self.hashcodes(min_precision, max_precision, cover, quick, cache, simplify,
+                                                  stats=stats, max_cells=max_cells, timeout=timeout,
+                                                  scanline=scanline)).compact())
+        if max_cells is not None or timeout is not None:
+            levels = self._levels(min_precision, max_precision, quick=quick, simplify=simplify, scanline=scanline)
+            return budget.to_hashcodes(budget.refine(levels, cover, max_cells, timeout))
+        if cache is not None:
+            return cache.fetch(HashcodeCache.key("polygon", self._rings if len(self._rings) > 1 else self._coordinates,
+                                                 min_precision, max_precision, cover, quick, simplify, scanline),
+                               lambda: self.hashcodes(min_precision, max_precision, cover, quick, simplify=simplify,
+                                                      stats=stats, scanline=scanline))
+        records = None if stats is None else list()
+        levels = self._levels(min_precision, max_precision, quick=quick, simplify=simplify, stats=records,
+                              scanline=scanline)
+        return Polygon._collect(levels, max_precision, cover, records, stats)
 
-        # generate all hashes covering the containing bounding box. Starting at south west
-        partially_contained = list()
-        row_hashcode = geohash.encode(polygon_bbox["s"], polygon_bbox["w"], min_precision)  # beware: lat, lon
-        row_bbox = geohash.bbox(row_hashcode)
+    def hashset(self, min_precision=2, max_precision=DEFAULT_PRECISION, cover=False, quick=False, simplify=False,
+                scanline=False):
+        """same as hashcodes, returned as a GeohashSet built straight from the integer geo hashes."""
+        max_precision = min(max_precision, DEFAULT_PRECISION)
+        levels = self._levels(min_precision, max_precision, quick=quick, simplify=simplify, scanline=scanline)
+        ids = [GeohashSet._id(cells[inside | boundary if cover and precision == max_precision else inside], precision)
+               for precision, cells, inside, boundary, _ in levels]
+        return GeohashSet._from_ids(np.concatenate(ids) if ids else [])
+
+    def iter_hashcodes(self, min_precision=2, max_precision=DEFAULT_PRECISION, cover=False, quick=False, batch=32):
+        """generator counterpart of hashcodes: yields geo hashes as soon as they are classified.
+
+        Boundary cells are refined depth first, `batch` cells (so 32 * batch children) at a time, so that memory only
+        depends on the depth of the walk instead of the size of the result. Geo hashes come in a different order than
+        from hashcodes.
+        """
+        max_precision = min(max_precision, DEFAULT_PRECISION)
+        if min_precision > max_precision:
+            return
+        stack = list()  # [precision, boundary cells, their pairs sorted by cell, next cell to refine]
+        precision, cells, pairs = min_precision, self._seeds(min_precision), None
+        while True:
+            boxes = inthash.bboxes(cells, precision)
+            if quick:
+                inside, boundary = self._quick_classify(boxes)
+            else:
+                inside, boundary, pairs = self._classify(boxes, self._grid_pairs(boxes) if pairs is None else pairs)
+                anchors = self._anchors(cells, precision)
+                inside, boundary = inside & ~anchors, boundary | anchors
+            last = precision == max_precision
+            for hashcode in inthash.to_hashcodes(cells[inside | boundary if cover and last else inside], precision):
+                yield hashcode
+            if not last and boundary.any():
+                if not quick:
+                    rank = (np.cumsum(boundary) - 1)[pairs[0]]
+                    order = np.argsort(rank, kind="stable")
+                    pairs = rank[order], pairs[1][order]
+                stack.append([precision, cells[boundary], pairs, 0])
+
+            # move on to the children of the next boundary cell at the deepest level
+            while stack and stack[-1][3] >= len(stack[-1][1]):
+                stack.pop()
+            if not stack:
+                return
+            frame = stack[-1]
+            precision, parents, parent_pairs, position = frame
+            frame[3] += batch
+            precision, cells = precision + 1, inthash.children(parents[position:position + batch])
+            if not quick:
+                start, stop = np.searchsorted(parent_pairs[0], [position, position + batch])
+                pairs = inthash.children(parent_pairs[0][start:stop] - position), \
+                    np.repeat(parent_pairs[1][start:stop], 32)
+
+    @staticmethod
+    def _collect(levels, max_precision, cover=False, records=None, stats=None):
+        """gather the geo hashes kept at each level: inside cells, plus boundary cells at max_precision in cover mode.
+        records is the stats list given to _levels, stats is then called with the LevelStats of each level."""
+        fully_contained = list()
+        for precision, cells, inside, boundary, _ in levels:
+            kept = cells[inside | boundary if cover and precision == max_precision else inside]
+            fully_contained.extend(inthash.to_hashcodes(kept, precision))
+            if stats is not None:
+                records[-1].emitted = len(kept)
+                stats(records[-1])
+        return fully_contained
+
+    def _seeds(self, precision):
+        """return the geo hashes covering the bounding box of the polygon, row by row starting at south west."""
+        polygon_bbox = self.bbox()
+        cells = list()
+        row_bits = inthash.encode(polygon_bbox["w"], polygon_bbox["s"], precision)
+        row_bbox = inthash.bbox(row_bits, precision)
         while row_bbox["s"] < polygon_bbox["n"]:
-            col_hashcode = row_hashcode
+            col_bits = row_bits
             col_bbox = row_bbox
             while is_west(col_bbox["w"], polygon_bbox["e"]):
-                partially_contained.append(col_hashcode)
-                col_hashcode = east(col_hashcode)
-                col_bbox = geohash.bbox(col_hashcode)
-            # move to the next row
-            row_hashcode = north(row_hashcode)
-            row_bbox = geohash.bbox(row_hashcode)
-
-        # filter hashes and decompose while max_precision is not reached
-        fully_contained = list()
-        curr_precision = min_precision
-        while curr_precision <= max_precision:
-            other_fully_contained, partially_contained = \
-                self._quick_filter(partially_contained, curr_precision < max_precision, cover=cover) if quick \
-                else self._filter(partially_contained, curr_precision < max_precision, cover=cover)
-            fully_contained.extend(other_fully_contained)
-            curr_precision += 1
-
-        # if len(fully_contained) == 0:  # if no inner bbox found and can't go further, then cover?
-        #     fully_contained.extend(partially_contained)
-        return fully_contained
+                cells.append(col_bits)
+                col_bits = inthash.adjacent(col_bits, precision, 'e')
+                col_bbox = inthash.bbox(col_bits, precision)
+            # move to the next row, if any: there is none past the top row of the grid
+            row_bits = inthash.adjacent(row_bits, precision, 'n')
+            if row_bits is None:
+                break
+            row_bbox = inthash.bbox(row_bits, precision)
+        return np.array(cells, dtype=np.int64)
+
+    def _levels(self, precision, max_precision, quick=False, cells=None, pairs=None, simplify=False, stats=None,
+                scanline=False):
+        """classify each precision level as one batch and decompose boundaries while max_precision is not reached.
+        Yields (precision, cells, inside, boundary, pairs) for each level, where inside and boundary are masks over
+        cells and pairs are the (cell, edge) pairs touching boundary cells (None in quick and scanline modes).
+
+        Starts from the seeds of the bounding box unless cells, and their pairs in exact mode, are given.
+        If stats is a list, the LevelStats of each level is appended to it before the level is yielded.
+        """
+        if precision > max_precision:
+            return
+        start = None if stats is None else time.perf_counter()
+        edges, margin = self._edge_array, 0.0
+        if simplify and not quick:
+            cols, rows = inthash.dimensions(max_precision)
+            margin = SIMPLIFICATION * min(360.0 / cols, 180.0 / rows)
+            edges = self._simplified(margin)
+        if cells is None:
+            cells = self._seeds(precision)
+        boxes = inthash.bboxes(cells, precision)
+        exact = not quick and not scanline
+        if exact and pairs is None:
+            pairs = self._grid_pairs(boxes, edges, margin)
+        while True:
+            if quick:
+                edge_tests = 0
+                inside, boundary = self._quick_classify(boxes)
+            elif scanline:
+                inside, boundary, edge_tests = self._scan_classify(cells, precision, edges, margin)
+            else:
+                edge_tests = len(pairs[0])
+                inside, boundary, pairs = self._classify(boxes, pairs, edges, margin)
+            if not quick:
+                anchors = self._anchors(cells, precision)
+                inside, boundary = inside & ~anchors, boundary | anchors
+            if stats is not None:
+                boundaries = int(np.count_nonzero(boundary))
+                stats.append(LevelStats(precision, len(cells), int(np.count_nonzero(inside)), boundaries, edge_tests,
+                                        4 * len(cells) if quick else 0 if scanline else len(cells) - boundaries,
+                                        time.perf_counter() - start))
+            yield precision, cells, inside, boundary, pairs
+            if precision >= max_precision:
+                return
+            start = None if stats is None else time.perf_counter()
+            cells, precision = inthash.children(cells[boundary]), precision + 1
+            if not scanline:
+                boxes = inthash.bboxes(cells, precision)
+            if exact:
+                pairs = Polygon._split_pairs(boundary, pairs)
+
+    def _grid_pairs(self, boxes, edges=None, margin=0.0):
+        """return the (cell, edge) pairs whose bboxes overlap. boxes must be the row-major grid of same sized cells
+        enumerated from the south west corner, so each edge only pairs with the rows and columns it spans.
+        Edges default to the edges of the polygon, their bboxes are grown by margin.
+        """
+        edges = self._edge_array if edges is None else edges
+        if not len(boxes):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        w, s, e, n = boxes[0]
+        width, height = e - w, n - s
+        cols = int(np.count_nonzero(boxes[:, 1] == s))
+        rows = len(boxes) // cols
+        lons, lats = edges[:, 0::2], edges[:, 1::2]
+        col0 = np.clip(np.ceil((lons.min(axis=1) - margin - w) / width).astype(int) - 1, 0, cols)
+        col1 = np.clip(np.floor((lons.max(axis=1) + margin - w) / width).astype(int), -1, cols - 1)
+        row0 = np.clip(np.ceil((lats.min(axis=1) - margin - s) / height).astype(int) - 1, 0, rows)
+        row1 = np.clip(np.floor((lats.max(axis=1) + margin - s) / height).astype(int), -1, rows - 1)
+        ncols, nrows = np.maximum(col1 - col0 + 1, 0), np.maximum(row1 - row0 + 1, 0)
+        edges = np.repeat(np.arange(len(edges)), ncols * nrows)
+        offsets = np.arange(len(edges)) - np.repeat(np.cumsum(ncols * nrows) - ncols * nrows, ncols * nrows)
+        cells = (row0[edges] + offsets // ncols[edges]) * cols + col0[edges] + offsets % ncols[edges]
+        return cells, edges
+
+    @staticmethod
+    def _split_pairs(boundary, pairs):
+        """map the (cell, edge) pairs of the boundary cells onto the 32 children of each cell."""
+        cells, edges = pairs
+        rank = np.cumsum(boundary) - 1
+        return inthash.children(rank[cells]), np.repeat(edges, 32)
+
+    def _classify(self, boxes, pairs, edges=None, margin=0.0):
+        """split cells into inside and boundary masks (the others are out). A cell is on the boundary when an edge
+        crosses it (see crosses_boxes); otherwise it lies on one side of the polygon and its center tells which one.
+        Returns the (cell, edge) pairs that do cross, as only those edges can cross children cells.
+
+        Edges default to the edges of the polygon. Simplified edges come with their tolerance as margin: a cell is
+        then on the boundary when an edge crosses its bbox grown by margin, which the actual rings may cross.
+        """
+        edges = self._edge_array if edges is None else edges
+        cells, indices = pairs
+        crossing = crosses_boxes(edges[indices], boxes[cells] + np.array([-margin, -margin, margin, margin]))
+        cells, indices = cells[crossing], indices[crossing]
+        boundary = np.zeros(len(boxes), dtype=bool)
+        boundary[cells] = True
+        inside = ~boundary
+        inside[inside] = self.contains_many((boxes[inside, 0] + boxes[inside, 2]) / 2,
+                                            (boxes[inside, 1] + boxes[inside, 3]) / 2)
+        return inside, boundary, (cells, indices)
+
+    def _scan_classify(self, cells, precision, edges=None, margin=0.0):
+        """scanline counterpart of _classify, with no (cell, edge) test at all. The edges are rasterized onto the
+        grid of the precision: a cell is on the boundary when it is one of the cells an edge passes through. Each
+        other cell lies on one side of the polygon, told by the parity of the edges crossing its row west of its
+        center, as in contains. Returns the inside and boundary masks over cells and the number of edge cells.
+
+        Edges default to the edges of the polygon. Simplified edges come with their tolerance as margin, the edges
+        are then rasterized as thick as that, see _classify.
+        """
+        edges = self._edge_array if edges is None else edges
+        cols, rows = inthash.dimensions(precision)
+        width, height = 360.0 / cols, 180.0 / rows
+        x, y = inthash.xy(cells, precision)
+        keys = y * (cols + 1) + x
+        traced = _trace(edges, cols, rows, margin)
+        boundary = np.isin(keys, traced)
+
+        # crossings of the row centers, assigned to the first column whose center is east of them
+        x0, y0, x1, y1 = (edges[:, i] for i in range(4))
+        slanted = y0 != y1
+        x0, y0, x1, y1 = x0[slanted], y0[slanted], x1[slanted], y1[slanted]
+        row0 = np.clip(np.ceil((np.minimum(y0, y1) + 90.0) / height - 0.5), 0, rows).astype(np.int64)
+        row1 = np.clip(np.ceil((np.maximum(y0, y1) + 90.0) / height - 0.5), 0, rows).astype(np.int64)
+        counts = np.maximum(row1 - row0, 0)
+        crossing_rows = np.repeat(row0, counts) + concat_ranges(counts)
+        lats = (crossing_rows + 0.5) * height - 90.0
+        x0, y0, x1, y1 = (np.repeat(values, counts) for values in (x0, y0, x1, y1))
+        lons = x0 + (lats - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.sort(crossing_rows * (cols + 1) +
+                            np.clip(np.floor((lons + 180.0) / width + 0.5), 0, cols).astype(np.int64))
+        west = np.searchsorted(crossings, keys, side="right") - np.searchsorted(crossings, y * (cols + 1))
+        inside = ~boundary & (west % 2 == 1)
+        return inside, boundary, len(traced)
+
+    def _anchors(self, cells, precision):
+        """tell which cells hold the first vertex of a ring. Those are boundary cells as in _filter, even when the
+        ring only runs along their border and crosses none of them."""
+        return np.isin(cells, [inthash.encode(ring[0][0], ring[0][1], precision) for ring in self._rings])
+
+    def _quick_classify(self, boxes):
+        """corner based counterpart of _classify, same bias as _quick_filter."""
+        corners = [self.contains_many(boxes[:, lon], boxes[:, lat]) for lon, lat in ((2, 1), (0, 1), (0, 3), (2, 3))]
+        boundary = (corners[0] != corners[1]) | (corners[0] != corners[2]) | (corners[0] != corners[3])
+        return corners[0] & ~boundary, boundary
 
     def _quick_filter(self, hashcodes, split=True, cover=False):
         """this way of filtering induces a small bias since we consider only corners of bboxes.
@@ -171,7 +590,7 @@ class Polygon:
         for hashcode in hashcodes:
             bbox = geohash.bbox(hashcode)
             if self.intersects(bbox) or\
-                    matches(*self._coordinates[0], hashcode):  # bbox contains polygon:
+                    any(matches(*ring[0], hashcode) for ring in self._rings):  # bbox contains a ring:
                 if split:
                     partially_contained.extend(subhashcodes(hashcode))  # decompose into smaller pieces
                 elif cover:
@@ -186,3 +605,71 @@ class Polygon:
                 # else out
 
         return fully_contained, partially_contained
+
+
+def _trace(edges, cols, rows, margin=0.0):
+    """return the cells of the grid of cols x rows geo hashes the edges pass through, as row * (cols + 1) + column
+    keys. Each edge is cut into the rows it spans, and each piece spans the columns between its ends, give or take
+    one for rounding. Those candidates are then tested with crosses_boxes against their bboxes grown by margin, as in
+    _classify, so meeting their border only does not count and both modes find the same boundary cells.
+    """
+    x0, y0, x1, y1 = (edges[:, i] for i in range(4))
+    width, height = 360.0 / cols, 180.0 / rows
+    south, north = np.minimum(y0, y1), np.maximum(y0, y1)
+    row0, row1 = _spans(south - margin, north + margin, -90.0, height, rows)
+    counts = np.maximum(row1 - row0 + 1, 0)
+    pieces = np.repeat(np.arange(len(edges)), counts)
+    piece_rows = np.repeat(row0, counts) + concat_ranges(counts)
+    x0, y0, x1, y1, south, north = (values[pieces] for values in (x0, y0, x1, y1, south, north))
+    # the part of the edge within the row, grown by margin, its ends taken from the vertices when they lie there
+    bottom = np.clip(piece_rows * height - 90.0 - margin, south, north)
+    top = np.clip((piece_rows + 1) * height - 90.0 + margin, south, north)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(y0 != y1, (x1 - x0) / (y1 - y0), 0.0)
+    ends = [np.where(lat == y0, x0, np.where(lat == y1, x1, x0 + (lat - y0) * slope)) for lat in (bottom, top)]
+    west = np.where(y0 != y1, np.minimum(*ends), np.minimum(x0, x1))
+    east = np.where(y0 != y1, np.maximum(*ends), np.maximum(x0, x1))
+    col0, col1 = _spans(west - margin, east + margin, -180.0, width, cols)
+    col0, col1 = np.maximum(col0 - 1, 0), np.minimum(col1 + 1, cols - 1)
+    counts = np.maximum(col1 - col0 + 1, 0)
+    pieces = np.repeat(pieces, counts)
+    piece_rows = np.repeat(piece_rows, counts)
+    piece_cols = np.repeat(col0, counts) + concat_ranges(counts)
+    boxes = np.stack([-180.0 + piece_cols * width - margin, -90.0 + piece_rows * height - margin,
+                      -180.0 + (piece_cols + 1) * width + margin, -90.0 + (piece_rows + 1) * height + margin], axis=-1)
+    crossing = crosses_boxes(edges[pieces], boxes)
+    return np.unique(piece_rows[crossing] * (cols + 1) + piece_cols[crossing])
+
+
+def _spans(low, high, origin, size, count):
+    """return the first and last of the count intervals [origin + i * size, origin + (i + 1) * size] whose inside
+    meets [low, high]. Bounds are checked against the borders of the intervals as inthash.bboxes computes them, as
+    dividing by size may round values lying within an ulp of a border onto it.
+    """
+    first = np.floor((low - origin) / size).astype(np.int64)
+    first += origin + (first + 1) * size <= low
+    first -= origin + first * size > low
+    last = np.ceil((high - origin) / size).astype(np.int64) - 1
+    last -= origin + last * size >= high
+    last += origin + (last + 1) * size < high
+    return np.clip(first, 0, count), np.clip(last, -1, count - 1)
+
+
+def _segment_distances(points, start, end):
+    """distances from the points (rows of [lon, lat]) to the segment [start, end], in degrees."""
+    direction = end - start
+    length = direction.dot(direction)
+    t = np.clip((points - start).dot(direction) / length, 0, 1) if length else np.zeros(len(points))
+    return np.hypot(*(points - start - t[:, None] * direction).T)
+
+
+class MultiPolygon(Polygon):
+    """several polygons rasterized in one pass. Each polygon is a list of rings, the exterior one first then its
+    holes, as in the coordinates of a GeoJSON MultiPolygon.
+    """
+
+    def __init__(self, polygons):
+        rings = [ring for polygon in polygons for ring in polygon]
+        if not rings:
+            raise ValueError("a multi polygon must have at least one polygon")
+        super().__init__(rings[0], rings[1:])
@@ -0,0 +1,61 @@
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils.batch import cover_circles
+from geotools.utils.batch import rasterize_many
+from geotools.utils.circle import Circle
+from geotools.utils.polygon import Polygon
+
+
+class BatchTestCase(TestCase):
+
+    def setUp(self):
+        self.polygons = [
+            Polygon([(2.32378006, 48.86403720), (2.35691071, 48.88616602), (2.37905502, 48.85816465)]),
+            Polygon([(-0.5, 51.2), (0.3, 51.3), (0.2, 51.7), (-0.4, 51.6)]),
+        ]
+
+    def assert_rasterized(self, workers, **kwargs):
+        results = [set() for _ in self.polygons]
+        for index, hashcodes in rasterize_many(self.polygons, 3, 7, workers=workers, **kwargs):
+            self.assertTrue(results[index].isdisjoint(hashcodes))
+            results[index].update(hashcodes)
+        for polygon, result in zip(self.polygons, results):
+            self.assertSetEqual(set(polygon.hashcodes(3, 7, **kwargs)), result)
+
+    def test_rasterize_many(self):
+        self.assert_rasterized(workers=1)
+        self.assert_rasterized(workers=3)
+        self.assert_rasterized(workers=3, cover=True)
+        self.assert_rasterized(workers=3, cover=True, quick=True)
+        self.assert_rasterized(workers=3, cover=True, scanline=True)
+
+    def test_streaming(self):
+        read = list()
+
+        def polygons():
+            for i in range(20):
+                read.append(i)
+                yield Polygon([(2.0 + i, 48.0), (2.4 + i, 48.1), (2.2 + i, 48.5)])
+
+        pending = 0
+        for _ in rasterize_many(polygons(), 3, 6, workers=2):
+            if len(read) < 20:
+                pending += 1
+        # more results than the coarse pieces of the polygons read so far: tiles came back meanwhile
+        self.assertGreater(pending, 20)
+
+    def test_cover_circles(self):
+        centers = [(2.35, 48.86), (-0.12, 51.51), (179.999, 0.0), (2.35, 48.86)]
+        radii = [1000, 500, 2000, 1]
+        for workers in (1, 2):
+            results = dict(cover_circles(centers, radii, 6, workers=workers, chunk=3))
+            self.assertListEqual([0, 1, 2, 3], sorted(results))
+            for index, (center, radius) in enumerate(zip(centers, radii)):
+                self.assertSetEqual(Circle(center, radius).hashcodes(6), results[index])
+        results = dict(cover_circles(centers, 1000, 6, workers=1))
+        self.assertSetEqual(results[0], results[3])
+        self.assertRaises(ValueError, list, cover_circles([(0.0, 89.9)], 1000, 6))
+
+if __name__ == '__main__':
+    main()
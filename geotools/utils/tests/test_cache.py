@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils.cache import HashcodeCache
+from geotools.utils.circle import Circle
+from geotools.utils.path import Path
+from geotools.utils.polygon import Polygon
+
+
+class CacheTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = HashcodeCache(os.path.join(self.directory.name, "cache.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_get_put(self):
+        key = HashcodeCache.key("polygon", [(0, 0), (1, 0), (0, 1)], 2, 6, False, False)
+        self.assertNotEqual(key, HashcodeCache.key("polygon", [(0, 0), (1, 0), (0, 1)], 2, 6, True, False))
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, ["u09tvx", "u09wj2"])
+        self.assertListEqual(["u09tvx", "u09wj2"], self.cache.get(key))
+        self.cache.put("empty", [])
+        self.assertListEqual([], self.cache.get("empty"))
+        self.cache.invalidate(key)
+        self.assertNotIn(key, self.cache)
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+
+    def test_eviction(self):
+        self.cache.max_size = 0
+        self.cache.put("a", ["u09tvx"])
+        self.assertEqual(0, len(self.cache))
+
+        self.cache.max_size = 1024
+        self.cache.put("a", ["u09tvx"])
+        self.cache.put("b", ["u09wj2", "u09wj8", "u09wj9"])
+        self.cache.get("a")
+        self.cache.max_size = self.cache.size() - 1
+        self.cache.put("c", [])
+        self.assertNotIn("b", self.cache)  # least recently used
+        self.assertIn("a", self.cache)
+        self.assertIn("c", self.cache)
+
+    def test_shapes(self):
+        polygon = Polygon([(2.32378006, 48.86403720), (2.35691071, 48.88616602), (2.37905502, 48.85816465)])
+        self.assertListEqual(polygon.hashcodes(3, 7), polygon.fill(3, 7, cache=self.cache))
+        self.assertListEqual(polygon.hashcodes(3, 7), polygon.fill(3, 7, cache=self.cache))
+        self.assertListEqual(polygon.cover(3, 7), polygon.cover(3, 7, cache=self.cache))
+        self.assertListEqual(polygon.scover(3, 7), polygon.scover(3, 7, cache=self.cache))
+        path = Path([(-0.123656, 51.51283), (-0.373535, 51.394043)])
+        self.assertListEqual(path.hashes(5), path.hashes(5, cache=self.cache))
+        circle = Circle((2.35, 48.86), 1000)
+        self.assertSetEqual(circle.hashcodes(6), circle.hashcodes(6, cache=self.cache))
+        self.assertEqual(5, len(self.cache))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import geohash
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils import destination_point
+from geotools.utils import distance
+from geotools.utils.circle import Circle
+from geotools.utils.hashset import GeohashSet, expand
+
+
+class CircleTestCase(TestCase):
+
+    def setUp(self):
+        self.center = (2.35, 48.86)
+        self.circle = Circle(self.center, 1000)
+
+    def test_bbox(self):
+        bbox = self.circle.bbox()
+        self.assertAlmostEqual(1000, distance(self.center, (self.center[0], bbox["n"])), places=6)
+        self.assertAlmostEqual(1000, distance(self.center, (self.center[0], bbox["s"])), places=6)
+        self.assertLess(self.center[0], bbox["e"])
+        self.assertGreater(self.center[0], bbox["w"])
+        self.assertAlmostEqual(bbox["e"] - self.center[0], self.center[0] - bbox["w"])
+
+    def test_hashcodes(self):
+        hashcodes = self.circle.hashcodes(7)
+        self.assertEqual(238, len(hashcodes))
+        # every point of the circle is covered
+        for bearing in range(0, 360, 5):
+            for length in (0, 250, 500, 999.9):
+                lon, lat = destination_point(self.center, length, bearing)
+                self.assertIn(geohash.encode(lat, lon, 7), hashcodes)
+        # and every cell gets close enough to the center
+        for hashcode in hashcodes:
+            bbox = geohash.bbox(hashcode)
+            nearest = (min(max(self.center[0], bbox["w"]), bbox["e"]), min(max(self.center[1], bbox["s"]), bbox["n"]))
+            self.assertLessEqual(distance(self.center, nearest), 1000 + 1e-6)
+
+    def test_antimeridian(self):
+        hashcodes = Circle((179.999, 0.0), 1000).hashcodes(5)
+        self.assertTrue(any(geohash.bbox(hashcode)["w"] < 0 for hashcode in hashcodes))
+        self.assertTrue(any(geohash.bbox(hashcode)["e"] > 0 for hashcode in hashcodes))
+
+    def test_poles(self):
+        self.assertRaises(ValueError, Circle, (0.0, 89.9), 1000)
+
+    def test_budget(self):
+        hashcodes = self.circle.hashcodes(7)
+        # without reaching the budget, the same cover with the inner cells merged
+        merged = self.circle.hashcodes(7, max_cells=10 ** 6)
+        self.assertLess(len(merged), len(hashcodes))
+        self.assertSetEqual(hashcodes, set(expand(merged, 7)))
+        for max_cells in (10, 50, 150):
+            budgeted = self.circle.hashcodes(7, max_cells=max_cells)
+            self.assertLessEqual(len(budgeted), max_cells)
+            covered = GeohashSet(budgeted)
+            self.assertTrue(all(covered.covers(hashcode) for hashcode in hashcodes))
+        self.assertSetEqual(merged, self.circle.hashcodes(7, timeout=60))
+        self.assertSetEqual(set(expand(Circle((179.999, 0.0), 1000).hashcodes(6, max_cells=10 ** 6), 6)),
+                            Circle((179.999, 0.0), 1000).hashcodes(6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import io
+import json
+import time
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils.circle import Circle
+from geotools.utils.features import cell_feature, read_features, read_sets, read_shapes, write_cells, write_sets, \
+    write_table
+from geotools.utils.path import Path
+from geotools.utils.polygon import MultiPolygon
+from geotools.utils.polygon import Polygon
+
+
+class FeaturesTestCase(TestCase):
+
+    def setUp(self):
+        square = [[2.0, 48.0], [3.0, 48.0], [3.0, 49.0], [2.0, 49.0], [2.0, 48.0]]
+        hole = [[2.4, 48.4], [2.6, 48.4], [2.6, 48.6], [2.4, 48.6], [2.4, 48.4]]
+        self.features = [
+            {"type": "Feature", "id": 0, "geometry": {"type": "Polygon", "coordinates": [square, hole]},
+             "properties": {"name": "squâre"}},
+            {"type": "Feature", "id": 1, "geometry": {"type": "MultiPolygon", "coordinates": [[square], [hole]]},
+             "properties": None},
+            {"type": "Feature", "id": 2, "geometry": {"type": "LineString", "coordinates": square},
+             "properties": {}},
+            {"type": "Feature", "id": 3, "geometry": {"type": "Point", "coordinates": [2.35, 48.85]},
+             "properties": {"radius": 1000}},
+            {"type": "Feature", "id": 4, "geometry": {"type": "Point", "coordinates": [2.35, 48.85, 35.0]},
+             "properties": {}}
+        ]
+        self.collection = json.dumps({"type": "FeatureCollection", "crs": {"type": "name"},
+                                      "features": self.features, "bbox": [2.0, 48.0, 3.0, 49.0]}, indent=2)
+
+    def test_read_features(self):
+        for chunk_size in (1, 7, 100, 1 << 16):
+            self.assertListEqual(self.features, list(read_features(io.StringIO(self.collection), chunk_size)))
+            self.assertListEqual(self.features,
+                                 list(read_features(io.BytesIO(self.collection.encode("utf-8")), chunk_size)))
+
+    def test_read_large_feature(self):
+        ring = [[2.0 + i * 1e-6, 48.0 + (i % 7) * 1e-3] for i in range(200000)]
+        feature = {"type": "Feature", "id": 0, "geometry": {"type": "Polygon", "coordinates": [ring + ring[:1]]},
+                   "properties": {}}
+        text = json.dumps({"type": "FeatureCollection", "features": [feature, feature]})
+        self.assertGreater(len(text), 5 * 10 ** 6)
+        start = time.perf_counter()
+        self.assertListEqual([feature, feature], list(read_features(io.StringIO(text), chunk_size=1024)))
+        # decoding again the whole feature on each chunk would take minutes
+        self.assertLess(time.perf_counter() - start, 10)
+
+    def test_read_ndjson(self):
+        lines = [json.dumps(feature) for feature in self.features] + [json.dumps(self.features[2]["geometry"])]
+        features = list(read_features(io.StringIO("\n".join(lines) + "\n"), 5))
+        self.assertListEqual(self.features, features[:-1])
+        self.assertEqual({"type": "Feature", "geometry": self.features[2]["geometry"], "properties": {}}, features[-1])
+        self.assertRaises(ValueError, list, read_features(io.StringIO('{"type": "Feature"} [1, 2]')))
+
+    def test_read_shapes(self):
+        shapes = list(read_shapes(io.StringIO(self.collection)))
+        self.assertListEqual([0, 1, 2, 3], [feature["id"] for feature, _ in shapes])
+        self.assertListEqual([Polygon, MultiPolygon, Path, Circle], [type(shape) for _, shape in shapes])
+        polygon = shapes[0][1]
+        self.assertTrue(polygon.contains((2.2, 48.5)))
+        self.assertFalse(polygon.contains((2.5, 48.5)))
+        self.assertEqual((2.35, 48.85), shapes[3][1].center)
+        self.assertEqual(1000, shapes[3][1].radius)
+
+    def test_write_cells(self):
+        results = [(0, ["u09", "u0d"]), (1, []), ("x", ["u0"])]
+        for ndjson in (False, True):
+            output = io.StringIO()
+            write_cells(output, iter(results), ndjson=ndjson)
+            features = list(read_features(io.StringIO(output.getvalue())))
+            self.assertListEqual([cell_feature("u09", 0), cell_feature("u0d", 0), cell_feature("u0", "x")], features)
+        self.assertListEqual([[1.40625, 47.8125], [2.8125, 47.8125], [2.8125, 49.21875], [1.40625, 49.21875],
+                              [1.40625, 47.8125]], cell_feature("u09")["geometry"]["coordinates"][0])
+        output = io.StringIO()
+        write_cells(output, [])
+        self.assertListEqual([], list(read_features(io.StringIO(output.getvalue()))))
+
+    def test_write_table(self):
+        output = io.StringIO()
+        write_table(output, [(0, ["u09", "u0d"]), ("x", ["u0"])])
+        self.assertEqual("geohash,feature\nu09,0\nu0d,0\nu0,x\n", output.getvalue())
+
+    def test_write_sets(self):
+        results = [(0, ["u09", "u0d"]), ("x", []), ({"a": 1}, ["u0", "u09x"])]
+        output = io.BytesIO()
+        write_sets(output, iter(results))
+        sets = list(read_sets(io.BytesIO(output.getvalue())))
+        self.assertListEqual([0, "x", {"a": 1}], [feature_id for feature_id, _ in sets])
+        self.assertListEqual([sorted(hashcodes) for _, hashcodes in results],
+                             [sorted(hashcodes) for _, hashcodes in sets])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import numpy as np
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils import destination_point
+from geotools.utils import distance
+from geotools.utils import geodesic
+
+
+class GeodesicTestCase(TestCase):
+
+    def setUp(self):
+        # classic vincenty example, flinders peak to buninyong
+        self.flinders = (144.42486788888888, -37.95103341666667)
+        self.buninyong = (143.92649552777777, -37.65282113888889)
+
+    def test_vincenty(self):
+        d = distance(self.flinders, self.buninyong, geodesic.VINCENTY)
+        self.assertAlmostEqual(54972.271, d, places=3)
+        self.assertAlmostEqual(1113194.908, distance((0, 0), (10, 0), geodesic.VINCENTY), places=3)
+        lon, lat = destination_point(self.flinders, 54972.271, 306.86815920333333, geodesic.VINCENTY)
+        self.assertAlmostEqual(self.buninyong[0], lon, places=7)
+        self.assertAlmostEqual(self.buninyong[1], lat, places=7)
+
+    def test_no_convergence(self):
+        self.assertTrue(np.isnan(geodesic.distances((0, 0), (179.7, 0.5), geodesic.VINCENTY)))
+
+    def test_many(self):
+        points = np.array([self.flinders, self.buninyong, (2.35, 48.85), (-0.12, 51.5)])
+        one_to_many = geodesic.distances(self.flinders, points)
+        self.assertEqual((4,), one_to_many.shape)
+        self.assertEqual(0, one_to_many[0])
+        pairwise = geodesic.distances(points, points[::-1])
+        for i in range(4):
+            self.assertAlmostEqual(distance(points[i], points[3 - i]), pairwise[i])
+        matrix = geodesic.distance_matrix(points, points[:2], geodesic.VINCENTY)
+        self.assertEqual((4, 2), matrix.shape)
+        self.assertAlmostEqual(matrix[1, 0], matrix[0, 1], places=4)
+
+    def test_destinations(self):
+        bearings = np.arange(0, 360, 45)
+        ends = geodesic.destinations((2.35, 48.85), 1000, bearings)
+        self.assertEqual((8, 2), ends.shape)
+        np.testing.assert_allclose(geodesic.distances((2.35, 48.85), ends), 1000)
+        for end, bearing in zip(ends, bearings):
+            lon, lat = destination_point((2.35, 48.85), 1000, bearing)
+            self.assertAlmostEqual(end[0], lon, places=9)
+            self.assertAlmostEqual(end[1], lat, places=9)
+
+    def test_scalar(self):
+        # single points skip numpy, with the same formulas
+        rng = np.random.default_rng(0)
+        points = np.column_stack([rng.uniform(-180, 180, 200), rng.uniform(-80, 80, 200)])
+        points = np.concatenate([points, [(0, 0), (10, 0), self.flinders, self.flinders]])
+        bearings, lengths = rng.uniform(0, 360, len(points)), rng.uniform(0, 10 ** 6, len(points))
+        for method in (geodesic.HAVERSINE, geodesic.VINCENTY):
+            expected = geodesic.distances(points, points[::-1], method)
+            ends = geodesic.destinations(points, lengths, bearings, method)
+            for i in range(len(points)):
+                d = geodesic.distance(tuple(points[i]), tuple(points[-1 - i]), method)
+                self.assertIsInstance(d, float)
+                self.assertAlmostEqual(expected[i], d, places=5)
+                lon, lat = geodesic.destination(tuple(points[i]), lengths[i], bearings[i], method)
+                self.assertAlmostEqual(ends[i][0], lon, places=9)
+                self.assertAlmostEqual(ends[i][1], lat, places=9)
+        self.assertEqual(0, geodesic.distance(self.flinders, self.flinders, geodesic.VINCENTY))
+        self.assertTrue(np.isnan(geodesic.distance((0, 0), (179.7, 0.5), geodesic.VINCENTY)))
+
+    def test_unknown_method(self):
+        self.assertRaises(ValueError, geodesic.distances, (0, 0), (1, 1), "flat")
+        self.assertRaises(ValueError, geodesic.distance, (0, 0), (1, 1), "flat")
+        self.assertRaises(ValueError, geodesic.destination, (0, 0), 1, 0, "flat")
+
+
+if __name__ == '__main__':
+    main()
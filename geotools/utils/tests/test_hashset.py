@@ -0,0 +1,66 @@
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils import BASE, subhashcodes
+from geotools.utils.hashset import GeohashSet, compact, expand
+from geotools.utils.polygon import Polygon
+
+
+class GeohashSetTestCase(TestCase):
+
+    def setUp(self):
+        self.hashcodes = GeohashSet(["u09tvx", "u09wj2", "u09", "gcpvj", "u09wj2"])
+
+    def test_iter(self):
+        self.assertEqual(4, len(self.hashcodes))
+        self.assertListEqual(["gcpvj", "u09", "u09tvx", "u09wj2"], list(self.hashcodes))
+        self.assertListEqual([], list(GeohashSet()))
+
+    def test_membership(self):
+        self.assertIn("u09", self.hashcodes)
+        self.assertIn("u09wj2", self.hashcodes)
+        self.assertNotIn("u0", self.hashcodes)
+        self.assertNotIn("u09wj", self.hashcodes)
+        self.assertTrue(self.hashcodes.covers("u09zzz"))
+        self.assertTrue(self.hashcodes.covers("gcpvj1tgyx"))
+        self.assertFalse(self.hashcodes.covers("gcpv"))
+
+    def test_set_operations(self):
+        other = GeohashSet(["u09", "zz"])
+        self.assertListEqual(["gcpvj", "u09", "u09tvx", "u09wj2", "zz"], list(self.hashcodes | other))
+        self.assertListEqual(["u09"], list(self.hashcodes & other))
+        self.assertListEqual(["gcpvj", "u09tvx", "u09wj2"], list(self.hashcodes - other))
+
+    def test_bytes(self):
+        data = self.hashcodes.to_bytes()
+        self.assertEqual(4 + 8 + 8 * 4, len(data))
+        self.assertEqual(self.hashcodes, GeohashSet.from_bytes(data))
+        self.assertRaises(ValueError, GeohashSet.from_bytes, b"nope")
+
+    def test_compact(self):
+        hashcodes = [hashcode + c for hashcode in subhashcodes("u0") for c in BASE] + subhashcodes("u09")[1:] + ["bc"]
+        self.assertListEqual(["bc", "u0"], compact(hashcodes))
+        self.assertListEqual(subhashcodes("u09")[1:] + ["u0d"], compact(subhashcodes("u0d") + subhashcodes("u09")[1:]))
+        self.assertListEqual([], compact([]))
+        self.assertEqual(GeohashSet(["bc", "u0"]), GeohashSet(hashcodes).compact())
+
+    def test_expand(self):
+        self.assertListEqual(["u09tvx"], list(expand(["u09tvx"], 6)))
+        self.assertListEqual(subhashcodes("u09") + ["u0d0"], list(expand(iter(["u09", "u0d0"]), 4)))
+        self.assertEqual(32 ** 3 + 32 ** 2, len(list(expand(["u0", "u09"], 5))))
+        self.assertRaises(ValueError, list, expand(["u09tvx"], 5))
+        self.assertSetEqual(set(expand(self.hashcodes, 6)), set(self.hashcodes.expand(6)))
+
+    def test_polygon(self):
+        polygon = Polygon([(2.32378006, 48.86403720), (2.35691071, 48.88616602), (2.37905502, 48.85816465)])
+        self.assertEqual(GeohashSet(polygon.hashcodes(3, 8)), polygon.hashset(3, 8))
+        self.assertEqual(GeohashSet(polygon.cover(3, 8)), polygon.hashset(3, 8, cover=True))
+        for cover in (False, True):
+            hashcodes = polygon.hashcodes(3, 7, cover=cover)
+            compacted = polygon.hashcodes(3, 7, cover=cover, compact=True)
+            self.assertLessEqual(len(compacted), len(hashcodes))
+            self.assertSetEqual(set(expand(hashcodes, 7)), set(expand(compacted, 7)))
+
+
+if __name__ == '__main__':
+    main()
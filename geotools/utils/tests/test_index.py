@@ -0,0 +1,36 @@
+import numpy as np
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils.index import PolygonIndex
+from geotools.utils.polygon import Polygon
+
+
+class PolygonIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.polygons = [
+            Polygon([(2.32378006, 48.86403720), (2.35691071, 48.88616602), (2.37905502, 48.85816465)]),
+            Polygon([(2.30, 48.85), (2.36, 48.85), (2.36, 48.89), (2.30, 48.89)]),
+            Polygon([(-0.5, 51.2), (0.3, 51.3), (0.2, 51.7), (-0.4, 51.6)]),
+        ]
+        self.index = PolygonIndex(self.polygons, min_precision=3, max_precision=6)
+
+    def test_query(self):
+        self.assertListEqual([0, 1], self.index.query((2.35, 48.87)))
+        self.assertListEqual([1], self.index.query((2.31, 48.88)))
+        self.assertListEqual([2], self.index.query((0.0, 51.5)))
+        self.assertListEqual([], self.index.query((10.0, 10.0)))
+
+    def test_query_many(self):
+        rng = np.random.default_rng(0)
+        lons = np.concatenate([rng.uniform(2.29, 2.39, 2000), rng.uniform(-0.6, 0.4, 2000)])
+        lats = np.concatenate([rng.uniform(48.84, 48.90, 2000), rng.uniform(51.1, 51.8, 2000)])
+        expected = [[index for index, polygon in enumerate(self.polygons) if polygon.contains((lon, lat))]
+                    for lon, lat in zip(lons, lats)]
+        self.assertListEqual(expected, self.index.query_many(lons, lats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import geohash
+import numpy as np
+
+from unittest import TestCase
+from unittest import main
+
+from geotools.utils import adjacent
+from geotools.utils import inthash
+
+
+class IntHashTestCase(TestCase):
+
+    def setUp(self):
+        self.london = (-0.123656, 51.51283)
+        self.hashcodes = ["u", "gc", "gcp", "gcpvj", "u09tvq", "7ruxg", "gcpvj1tgyx", "000000000000", "zzzzzzzzzzzz"]
+
+    def test_encode(self):
+        for precision in range(1, 13):
+            bits = inthash.encode(self.london[0], self.london[1], precision)
+            self.assertEqual(geohash.encode(self.london[1], self.london[0], precision),
+                             inthash.to_hashcode(bits, precision))
+
+    def test_encode_many(self):
+        lons = np.array([self.london[0], 0.0, -1e-300, 180.0, -180.0, 2.35])
+        lats = np.array([self.london[1], 0.0, -1e-300, 45.0, -90.0, 48.86])
+        for precision in (1, 5, 9, 12):
+            self.assertListEqual([inthash.encode(lon, lat, precision) for lon, lat in zip(lons, lats)],
+                                 list(inthash.encode_many(lons, lats, precision)))
+
+    def test_hashcode(self):
+        for hashcode in self.hashcodes:
+            bits = inthash.from_hashcode(hashcode)
+            self.assertEqual(hashcode, inthash.to_hashcode(bits, len(hashcode)))
+            self.assertListEqual([hashcode], inthash.to_hashcodes(np.array([bits]), len(hashcode)))
+
+    def test_bbox(self):
+        for hashcode in self.hashcodes:
+            bits = inthash.from_hashcode(hashcode)
+            self.assertDictEqual(geohash.bbox(hashcode), inthash.bbox(bits, len(hashcode)))
+            bbox = geohash.bbox(hashcode)
+            self.assertListEqual([bbox["w"], bbox["s"], bbox["e"], bbox["n"]],
+                                 list(inthash.bboxes(np.array([bits]), len(hashcode))[0]))
+
+    def test_adjacent(self):
+        for hashcode in self.hashcodes:
+            bits = inthash.from_hashcode(hashcode)
+            for direction in "nsew":
+                expected = adjacent(hashcode, direction)
+                actual = inthash.adjacent(bits, len(hashcode), direction)
+                self.assertEqual(expected, None if actual is None else inthash.to_hashcode(actual, len(hashcode)))
+
+    def test_hierarchy(self):
+        bits = inthash.from_hashcode("gcpv")
+        self.assertListEqual(["gcpv" + c for c in "0123456789bcdefghjkmnpqrstuvwxyz"],
+                             [inthash.to_hashcode(child, 5) for child in inthash.children(bits)])
+        self.assertListEqual(list(inthash.children(bits)), list(inthash.children(np.array([bits]))))
+        self.assertEqual(bits, inthash.parent(inthash.from_hashcode("gcpvj")))
+
+    def test_expand(self):
+        bits = np.array([inthash.from_hashcode("gcpv"), inthash.from_hashcode("u09t")])
+        expected = inthash.children(inthash.children(bits))
+        for block in (1, 100, 1024, 1 << 16):
+            chunks = list(inthash.expand(bits, 4, 6, block))
+            self.assertListEqual(expected.tolist(), np.concatenate(chunks).tolist())
+            self.assertLessEqual(max(len(chunk) for chunk in chunks), max(block, 1024))
+        self.assertListEqual([bits[0]], np.concatenate(list(inthash.expand(bits[0], 4, 4))).tolist())
+
+    def test_compact(self):
+        full, partial, other = (inthash.from_hashcode(hashcode) for hashcode in ("gcpv", "gcpw", "u09"))
+        cells = [(5, np.concatenate([inthash.children(np.array([full])), inthash.children(np.array([partial]))[1:]])),
+                 (3, np.array([other]))]
+        compacted = inthash.compact(cells)
+        self.assertListEqual([3, 4, 5], [precision for precision, _ in compacted])
+        self.assertListEqual([other], compacted[0][1].tolist())
+        self.assertListEqual([full], compacted[1][1].tolist())
+        self.assertListEqual(inthash.children(np.array([partial]))[1:].tolist(), compacted[2][1].tolist())
+        self.assertListEqual([], inthash.compact([]))
+
+
+if __name__ == '__main__':
+    main()
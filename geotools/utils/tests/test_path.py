@@ -1,7 +1,17 @@
+import asyncio
+import geohash
+import numpy as np
+
 from unittest import TestCase
 from unittest import main
 
+from geotools.utils import distance
+from geotools.utils import geodesic
+from geotools.utils import inthash
+from geotools.utils.circle import Circle
+from geotools.utils.hashset import GeohashSet
 from geotools.utils.path import Path
+from geotools.utils.path import PathStream
 
 
 class GeoHashTestCase(TestCase):
@@ -13,5 +23,94 @@ class GeoHashTestCase(TestCase):
         self.assertTrue({'gcpu9', 'gcpuf', 'gcpug', 'gcpu2', 'gcpuu',  'gcpud', 'gcpu8', 'gcpsr', 'gcpvh', 'gcpvj'}.issubset(hashes))
         self.assertEqual(10, len(hashes))
 
+    def test_hashes_with_several_segments(self):
+        london = (-0.123656, 51.51283)
+        west_molesey = (-0.373535, 51.394043)
+        guildford = (-0.570409, 51.236220)
+        hashes = Path([london, west_molesey, guildford]).hashes(5)
+        self.assertTrue(set(Path([london, west_molesey]).hashes(5)).issubset(hashes))
+        self.assertTrue(set(Path([west_molesey, guildford]).hashes(5)).issubset(hashes))
+        self.assertEqual(len(hashes), len(set(hashes)))
+
+    def test_long_track(self):
+        # far more way points than the recursion limit, every step goes to an adjacent cell
+        track = [(2.35 + i * 1e-4, 48.85 + (i % 7) * 1e-4) for i in range(5000)]
+        cells = Path._cells(track, 8)
+        self.assertEqual(len(cells), len(set(cells)))
+        self.assertEqual(set(Path._cells(track[:2], 8)), set(cells[:len(Path._cells(track[:2], 8))]))
+        steps = list(Path._traverse((2.35, 48.85), (2.9, 48.6), 8))
+        for (x0, y0), (x1, y1) in zip(steps, steps[1:]):
+            self.assertEqual(1, abs(x1 - x0) + abs(y1 - y0))
+        self.assertEqual(inthash.xy(inthash.encode(2.9, 48.6, 8), 8), steps[-1])
+
+    def test_buffer_hashes(self):
+        london = (-0.123656, 51.51283)
+        west_molesey = (-0.373535, 51.394043)
+        path = Path([london, west_molesey])
+        corridor = path.buffer_hashes(2000, 7)
+        self.assertIsInstance(corridor, GeohashSet)
+        # the cells the path crosses are all in, the inner ones at a coarser precision
+        self.assertTrue(all(corridor.covers(hashcode) for hashcode in path.hashes(7)))
+        self.assertLess(min(len(hashcode) for hashcode in corridor), 7)
+        for bearing in range(0, 360, 10):
+            for length in (500, 1900):
+                lon, lat = geodesic.destinations(west_molesey, length, bearing)
+                self.assertTrue(corridor.covers(geohash.encode(lat, lon, 7)))
+        # and none of them is out of reach
+        samples = np.linspace(london, west_molesey, 1001)
+        for hashcode in corridor:
+            lat, lon, dlat, dlon = geohash.decode_exactly(hashcode)
+            radius = distance((lon - dlon, lat - dlat), (lon + dlon, lat + dlat)) / 2
+            self.assertLessEqual(geodesic.distances((lon, lat), samples).min(), 2000 + radius + 10)
+        self.assertEqual(set(path.hashes(7)), set(path.buffer_hashes(0, 7)))
+
+    def test_buffer_antimeridian(self):
+        for sign in (1, -1):
+            start, end = (sign * 179.995, 0.0), (sign * 179.999, 0.01)
+            corridor = Path([start, end]).buffer_hashes(2000, 6)
+            # the corridor reaches across the antimeridian, as circles do
+            self.assertTrue(all(corridor.covers(hashcode) for hashcode in Circle(end, 1900).hashcodes(6)))
+            lon, lat = geodesic.destinations(end, 1500, 90 * sign)
+            self.assertTrue(-sign * lon > 0)
+            self.assertTrue(corridor.covers(geohash.encode(lat, lon, 6)))
+
+    def test_stream(self):
+        track = [(-0.123656, 51.51283), (-0.373535, 51.394043), (-0.570409, 51.236220)]
+        stream = PathStream(5)
+        self.assertEqual(Path(track).hashes(5), list(stream.stream(iter(track))))
+        self.assertEqual([], stream.push(track[-1]))
+        chunked = PathStream(5)
+        self.assertEqual(Path(track).hashes(5), chunked.extend(track[:2]) + chunked.extend(track[2:]))
+
+    def test_stream_window(self):
+        # back and forth between two cells: only the window decides what is emitted again
+        track = [(2.3501, 48.85), (2.3601, 48.85)] * 3
+        self.assertEqual(2, len(list(PathStream(6, window=16).stream(track))))
+        self.assertEqual(6, len(list(PathStream(6, window=1).stream(track))))
+        self.assertRaises(ValueError, PathStream, 7, 0)
+
+    def test_stream_asyncio(self):
+        track = [(-0.123656, 51.51283), (-0.373535, 51.394043), (-0.570409, 51.236220)]
+
+        async def consume(stream):
+            queue = asyncio.Queue()
+            for point in track + [None]:
+                queue.put_nowait(point)
+            hashcodes = []
+            while True:
+                point = await queue.get()
+                if point is None:
+                    return hashcodes
+                hashcodes.extend(stream.push(point))
+
+        # asyncio.run needs python 3.7
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self.assertEqual(Path(track).hashes(5), loop.run_until_complete(consume(PathStream(5))))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
 if __name__ == '__main__':
     main()
@@ -1,9 +1,14 @@
 import geohash
+import math
 
 from unittest import TestCase
 from unittest import main
 
+from geotools.utils import intersects, subhashcodes
+from geotools.utils.hashset import GeohashSet
+from geotools.utils.polygon import MultiPolygon
 from geotools.utils.polygon import Polygon
+from geotools.utils.polygon import RasterStats
 
 
 class GeoHashTestCase(TestCase):
@@ -38,6 +43,17 @@ class GeoHashTestCase(TestCase):
         self.assertTrue(self.polygon.contains((u09wj2["w"], u09wj2["s"])))  # sw of u09wj2
         self.assertTrue(self.polygon.contains(self.polygon._coordinates[0]))  # first point of polygon
 
+    def test_contains_many(self):
+        vertices = list(self.polygon._coordinates)
+        midpoints = [((a[0] + b[0]) / 2, (a[1] + b[1]) / 2) for a, b in zip(vertices, vertices[1:] + vertices[:1])]
+        corners = [(bbox[w], bbox[s]) for bbox in map(geohash.bbox, subhashcodes("u09t") + subhashcodes("u09w"))
+                   for w in "we" for s in "sn"]
+        points = vertices + midpoints + corners + [(2.2, 48.8), (2.35, 48.95)]
+        lons, lats = zip(*points)
+        self.assertListEqual([self.polygon.contains(point) for point in points],
+                             list(self.polygon.contains_many(lons, lats)))
+        self.assertEqual((2, 2), self.polygon.contains_many([[2.35, 2.2], [2.35, 2.2]], 48.87).shape)
+
     def test_intersects(self):
         bboxes = {
             "u09wj5": False,  # out
@@ -51,6 +67,37 @@ class GeoHashTestCase(TestCase):
             bbox = geohash.bbox(hashcode)
             self.assertEqual(expected, self.polygon.intersects(bbox))
 
+    def test_edge_index(self):
+        # a star shaped polygon has enough edges to spread over several slabs
+        star = Polygon([
+            (2.35 + (0.05 if i % 2 else 0.02) * math.cos(i * math.pi / 32),
+             48.85 + (0.05 if i % 2 else 0.02) * math.sin(i * math.pi / 32)) for i in range(64)])
+        self.assertLess(1, len(star._slabs))
+
+        def brute_contains(point):
+            inside = False
+            prev = star._coordinates[-1]
+            for curr in star._coordinates:
+                if ((curr[1] > point[1]) != (prev[1] > point[1])) \
+                        and (point[0] < (prev[0] - curr[0]) * (point[1] - curr[1]) / (prev[1] - curr[1]) + curr[0]):
+                    inside = not inside
+                prev = curr
+            return inside
+
+        for hashcode in subhashcodes("u09t") + subhashcodes("u09w") + list(star._coordinates):
+            point = hashcode if isinstance(hashcode, tuple) else geohash.decode(hashcode)[::-1]
+            self.assertEqual(brute_contains(point), star.contains(point))
+        for hashcode in [h + c for h in subhashcodes("u09t") + subhashcodes("u09w") for c in "0gz"]:
+            bbox = geohash.bbox(hashcode)
+            expected = any(
+                intersects(side, edge)
+                for edge in zip(star._coordinates[-1:] + star._coordinates[:-1], star._coordinates)
+                for side in (((bbox["w"], bbox["s"]), (bbox["e"], bbox["s"])),
+                             ((bbox["e"], bbox["s"]), (bbox["e"], bbox["n"])),
+                             ((bbox["e"], bbox["n"]), (bbox["w"], bbox["n"])),
+                             ((bbox["w"], bbox["n"]), (bbox["w"], bbox["s"]))))
+            self.assertEqual(expected, star.intersects(bbox))
+
     def test_filter(self):
         hashes_to_be_checked = [
             "u09wj5",  # out
@@ -98,6 +145,180 @@ class GeoHashTestCase(TestCase):
         for hashcode in hashcodes:
             self.assertTrue(hashcode.startswith("u09"))
 
+    def test_iter_hashes(self):
+        hashcodes = self.polygon.iter_hashcodes(min_precision=3, max_precision=9)
+        self.assertEqual("u09", next(iter(hashcodes))[:3])
+        for cover in (False, True):
+            for quick in (False, True):
+                expected = self.polygon.hashcodes(3, 8, cover=cover, quick=quick)
+                actual = list(self.polygon.iter_hashcodes(3, 8, cover=cover, quick=quick))
+                self.assertEqual(len(expected), len(actual))
+                self.assertSetEqual(set(expected), set(actual))
+
+    def test_hashes_match_filters(self):
+        # the batch classification must agree with the cell by cell filters
+        for cover in (False, True):
+            for quick in (False, True):
+                filter = self.polygon._quick_filter if quick else self.polygon._filter
+                expected, partially_contained = list(), subhashcodes("u09")
+                for precision in range(4, 8):
+                    fully_contained, partially_contained = filter(partially_contained, precision < 7, cover=cover)
+                    expected.extend(fully_contained)
+                self.assertListEqual(expected, self.polygon.hashcodes(4, 7, cover=cover, quick=quick))
+        # a ring along the grid: cells sharing a border with it are out, as with the filters. These split the cells
+        # along the ring further, and their corner test leaves out the inside cells with corners on the ring.
+        aligned = Polygon([(0.0, 0.0), (22.5, 0.0), (22.5, 5.625), (11.25, 5.625), (11.25, 11.25), (0.0, 11.25)])
+        for cover in (False, True):
+            expected, partially_contained = list(), subhashcodes("s")
+            for precision in range(2, 5):
+                fully_contained, partially_contained = aligned._filter(partially_contained, precision < 4, cover)
+                expected.extend(fully_contained)
+            expected, actual = GeohashSet(expected).expand(4), GeohashSet(aligned.hashcodes(2, 4, cover=cover))
+            self.assertTrue(set(expected).issubset(actual.expand(4)))
+            if cover:
+                self.assertSetEqual({"s0", "s1", "s2"}, set(actual.compact()))
+            self.assertSetEqual(set(actual), set(aligned.hashcodes(2, 4, cover=cover, scanline=True)))
+        self.assertEqual(32, len(Polygon([(0, 0), (11.25, 0), (11.25, 5.625), (0, 5.625)]).hashcodes(1, 3, cover=True)))
+
+    def test_scanline(self):
+        for cover in (False, True):
+            self.assertListEqual(sorted(self.polygon.hashcodes(3, 8, cover=cover)),
+                                 sorted(self.polygon.hashcodes(3, 8, cover=cover, scanline=True)))
+        self.assertListEqual(sorted(self.polygon.fill(3, 8)), sorted(self.polygon.sfill(3, 8)))
+        self.assertListEqual(sorted(self.polygon.cover(3, 8)), sorted(self.polygon.scover(3, 8)))
+        # a spike thinner than the cells: corners miss it, the edges do not
+        spike = Polygon([(2.0, 48.0), (3.0, 48.0), (3.0, 48.5), (2.5, 48.5), (2.5001, 49.3), (2.4999, 49.3),
+                         (2.4999, 48.5), (2.0, 48.5)])
+        for cover in (False, True):
+            exact = set(spike.hashcodes(3, 5, cover=cover))
+            self.assertSetEqual(exact, set(spike.hashcodes(3, 5, cover=cover, scanline=True)))
+        self.assertFalse(GeohashSet(spike.qcover(3, 5)).covers(geohash.encode(49.2, 2.5, 5)))
+        self.assertTrue(GeohashSet(spike.scover(3, 5)).covers(geohash.encode(49.2, 2.5, 5)))
+        with self.assertRaises(ValueError):
+            spike.hashcodes(3, 5, quick=True, scanline=True)
+        # vertices on grid lines, and an edge that only meets a corner of 7yp6d
+        snapped = Polygon([(-2.1592624324157006, -21.744505491667486), (-0.615234375, -23.7744140625),
+                           (-3.1640625, -23.90625), (-1.58203125, -23.23256633900089)])
+        for cover in (False, True):
+            self.assertSetEqual(set(snapped.hashcodes(3, 6, cover=cover)),
+                                set(snapped.hashcodes(3, 6, cover=cover, scanline=True)))
+        self.assertNotIn("7yp6d", snapped.scover(3, 6))
+
+    def test_holes(self):
+        outer = [(2.0, 48.0), (3.0, 48.0), (3.0, 49.0), (2.0, 49.0)]
+        hole = [(2.3, 48.3), (2.7, 48.3), (2.7, 48.7), (2.3, 48.7)]
+        polygon = Polygon(outer, holes=[hole])
+        self.assertFalse(polygon.contains((2.5, 48.5)))
+        self.assertTrue(polygon.contains((2.1, 48.5)))
+        self.assertListEqual([False, True], polygon.contains_many([2.5, 2.1], [48.5, 48.5]).tolist())
+        hole_polygon = Polygon(hole)
+        hashcodes = polygon.hashcodes(3, 6)
+        filled = GeohashSet(hashcodes)
+        for hashcode in hashcodes:
+            bbox = geohash.bbox(hashcode)
+            self.assertFalse(hole_polygon.intersects(bbox))
+            self.assertFalse(hole_polygon.contains(((bbox["w"] + bbox["e"]) / 2, (bbox["s"] + bbox["n"]) / 2)))
+        for hashcode in Polygon(outer).hashcodes(3, 6):
+            bbox = geohash.bbox(hashcode)
+            if bbox["e"] < 2.3 or bbox["w"] > 2.7 or bbox["n"] < 48.3 or bbox["s"] > 48.7:
+                self.assertTrue(filled.covers(hashcode))
+        for cover in (False, True):
+            for quick in (False, True):
+                self.assertSetEqual(set(polygon.hashcodes(3, 6, cover=cover, quick=quick)),
+                                    set(polygon.iter_hashcodes(3, 6, cover=cover, quick=quick)))
+            self.assertSetEqual(set(polygon.hashcodes(3, 6, cover=cover)),
+                                set(polygon.hashcodes(3, 6, cover=cover, scanline=True)))
+        # the inner part of the hole is pruned at coarse precision instead of being refined
+        for hashcode in polygon.cover(3, 6):
+            self.assertFalse(hole_polygon.contains(geohash.decode(hashcode)[::-1]) and
+                             not hole_polygon.intersects(geohash.bbox(hashcode)))
+
+    def test_multi_polygon(self):
+        west = [(2.0, 48.0), (2.4, 48.0), (2.4, 48.4), (2.0, 48.4)]
+        east = [(2.6, 48.0), (3.0, 48.0), (3.0, 48.4), (2.6, 48.4)]
+        hole = [(2.7, 48.1), (2.9, 48.1), (2.9, 48.3), (2.7, 48.3)]
+        polygon = MultiPolygon([[west], [east, hole]])
+        self.assertDictEqual({"w": 2.0, "s": 48.0, "e": 3.0, "n": 48.4}, polygon.bbox())
+        expected = set(Polygon(west).hashcodes(3, 6)) | set(Polygon(east, [hole]).hashcodes(3, 6))
+        self.assertSetEqual(expected, set(polygon.hashcodes(3, 6)))
+        self.assertRaises(ValueError, MultiPolygon, [])
+        self.assertRaises(ValueError, Polygon, west, [[(2.1, 48.1), (2.2, 48.2)]])
+
+    def test_simplify(self):
+        angles = [2 * math.pi * i / 5000 for i in range(5000)]
+        radii = [1 + 0.1 * math.sin(7 * angle) + 0.002 * math.sin(977 * angle) for angle in angles]
+        polygon = Polygon([(2.35 + 1.5 * r * math.cos(angle), 48.85 + r * math.sin(angle))
+                           for r, angle in zip(radii, angles)])
+        edges = polygon._simplified(0.01)
+        self.assertLess(len(edges), len(polygon._edge_array) / 10)
+        self.assertEqual(polygon._edge_array[0, 2:].tolist(), edges[0, :2].tolist())
+
+        def expand(hashcodes):
+            cells = set()
+            for hashcode in hashcodes:
+                children = [hashcode]
+                while len(children[0]) < 5:
+                    children = [child for parent in children for child in subhashcodes(parent)]
+                cells.update(children)
+            return cells
+
+        # a simplified cover only gets more cells, a simplified fill only fewer
+        exact, simplified = polygon.cover(2, 5), polygon.hashcodes(2, 5, cover=True, simplify=True)
+        self.assertTrue(expand(exact).issubset(expand(simplified)))
+        self.assertLess(len(expand(simplified)), len(expand(exact)) * 1.1)
+        exact, simplified = polygon.fill(2, 5), polygon.hashcodes(2, 5, simplify=True)
+        self.assertTrue(expand(simplified).issubset(expand(exact)))
+        self.assertEqual(set(simplified), set(polygon.hashset(2, 5, simplify=True)))
+        self.assertEqual(set(simplified), set(polygon.hashset(2, 5, simplify=True, scanline=True)))
+        for cover in (False, True):
+            self.assertSetEqual(set(polygon.hashcodes(2, 5, cover=cover)),
+                                set(polygon.hashcodes(2, 5, cover=cover, scanline=True)))
+
+    def test_stats(self):
+        for quick in (False, True):
+            stats = RasterStats()
+            hashcodes = self.polygon.hashcodes(3, 8, cover=True, quick=quick, stats=stats)
+            self.assertListEqual([3, 4, 5, 6, 7, 8], [level.precision for level in stats])
+            self.assertEqual(len(hashcodes), stats.totals()["emitted"])
+            for parent, level in zip(stats, stats[1:]):
+                self.assertEqual(32 * parent.boundary, level.candidates)
+            for level in stats:
+                self.assertEqual(level.candidates, level.inside + level.boundary + level.outside)
+                self.assertGreaterEqual(level.seconds, 0)
+            self.assertEqual(stats[-1].inside + stats[-1].boundary, stats[-1].emitted)
+            if quick:
+                self.assertEqual(0, stats.totals()["edge_tests"])
+            else:
+                self.assertGreater(stats[0].edge_tests, 0)
+        self.assertIn("point tests", str(stats))
+        stats = RasterStats()
+        self.polygon.hashcodes(3, 8, cover=True, scanline=True, stats=stats)
+        self.assertEqual(0, stats.totals()["point_tests"])
+        self.assertGreaterEqual(stats[-1].edge_tests, stats[-1].boundary)
+        levels = list()
+        self.polygon.hashcodes(3, 5, stats=levels.append)
+        self.assertListEqual([3, 4, 5], [level.precision for level in levels])
+        self.assertEqual(levels[-1].inside, levels[-1].emitted)
+
+    def test_budget(self):
+        for cover in (False, True):
+            expected = self.polygon.hashcodes(3, 7, cover=cover)
+            self.assertSetEqual(set(expected), set(self.polygon.hashcodes(3, 7, cover=cover, max_cells=10 ** 6)))
+            self.assertSetEqual(set(expected), set(self.polygon.hashcodes(3, 7, cover=cover, timeout=60)))
+            for max_cells in (20, 100, 500):
+                budgeted = self.polygon.hashcodes(3, 7, cover=cover, max_cells=max_cells)
+                self.assertLessEqual(len(budgeted), max_cells)
+                if cover:
+                    # still a cover: every cell of the full cover is in a budgeted one
+                    covered = GeohashSet(budgeted)
+                    self.assertTrue(all(covered.covers(hashcode) for hashcode in expected))
+                else:
+                    filled = GeohashSet(expected)
+                    self.assertTrue(all(filled.covers(hashcode) for hashcode in budgeted))
+        # the coarsest level comes back whatever the budget
+        self.assertListEqual(["u09"], self.polygon.hashcodes(3, 7, cover=True, max_cells=1))
+        self.assertListEqual(["u09"], self.polygon.hashcodes(3, 9, cover=True, timeout=0))
+
 
 if __name__ == '__main__':
     main()
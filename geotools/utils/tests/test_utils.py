@@ -78,6 +78,19 @@ class UtilsTestCase(TestCase):
         # one edge of segment is on the other segment
         assert_intersects(((0, 0), (2, 2)), ((1, 1), (2, 0)))
 
+    def test_crosses_boxes(self):
+        segments = np.array([
+            (0, 0, 2, 2),  # crosses
+            (0.5, 0.5, 0.6, 0.6),  # inside
+            (-1, 0, 0, 1),  # only touches a corner
+            (-1, 0.5, 0, 2),  # misses the corner
+            (2, -1, 2, 3),  # misses the east side
+            (0, -1, 0, 2),  # runs along the west side
+            (-1, 0.5, 0, 0.5),  # ends on the west side
+        ], dtype=float)
+        boxes = np.array([(0, 0, 1, 1)] * len(segments), dtype=float)
+        self.assertListEqual([True, True, False, False, False, False, False], list(crosses_boxes(segments, boxes)))
+
     def test_is_west(self):
         self.assertTrue(is_west(1, 2))
         self.assertTrue(is_west(1, 180))
@@ -189,5 +202,23 @@ class UtilsTestCase(TestCase):
         self.assertEqual("7n", adjacent("7q", 'w'))
         self.assertEqual("6y", adjacent("7n", 'w'))
 
+    def test_adjacent_cache(self):
+        try:
+            cache_adjacent(16)
+            self.assertEqual("e2hs5", adjacent("e2heg", 'n'))
+            self.assertEqual("e2hs5", adjacent("e2heg", 'n'))
+            self.assertEqual(None, adjacent("gz", 'n'))
+            self.assertRaises(ValueError, adjacent, "e2hea", 'n')
+        finally:
+            cache_adjacent(0)
+
+    def test_neighbours(self):
+        self.assertDictEqual({
+            'n': "gcpvm", 'ne': "gcpvq", 'e': "gcpvn", 'se': "gcpuy",
+            's': "gcpuv", 'sw': "gcpuu", 'w': "gcpvh", 'nw': "gcpvk"
+        }, neighbours("gcpvj"))
+        self.assertEqual(None, neighbours("zz")['nw'])
+        self.assertEqual("bp", neighbours("zz")['e'])
+
 if __name__ == '__main__':
     main()